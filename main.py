@@ -1,24 +1,102 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, fields, is_dataclass, replace
 from datetime import datetime, timedelta
+import asyncio
+import base64
+import contextvars
+import functools
+import gzip
+import hashlib
+import hmac
 import io
+import ipaddress
 import json
 import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl
 
-app = FastAPI(title="YouTube Automation - Stock Data API")
+import orjson
+
+try:
+    import brotli  # 선택 의존성: 없으면 gzip만 협상
+except ImportError:
+    brotli = None
+
+# 백그라운드 서비스 (시작, 종료) 코루틴 함수 — 각 섹션에서 등록, lifespan이 등록 순서대로 실행
+_BACKGROUND_SERVICES: list = []
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    for start, _ in _BACKGROUND_SERVICES:
+        await start()
+    try:
+        yield
+    finally:
+        for _, stop in reversed(_BACKGROUND_SERVICES):
+            await stop()
+
+
+app = FastAPI(title="YouTube Automation - Stock Data API", lifespan=_lifespan)
 
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY", "")
 RAPIDAPI_KEY = os.environ.get("RAPIDAPI_KEY", "")
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 
-# 기존 고정 종목 목록 (헤드라인 추출 비교용)
-US_FIXED_TICKERS = {"AAPL", "MSFT", "NVDA", "TSLA", "GOOGL", "AMZN", "META", "AMD", "AVGO"}
-KR_FIXED_NAMES = {
-    "삼성전자", "SK하이닉스", "LG에너지솔루션", "현대차", "NAVER",
-    "카카오", "삼성SDI", "삼성바이오로직스", "셀트리온", "POSCO홀딩스",
+# ── 기본 관심 목록 (watchlists.json이 없거나 항목을 지정하지 않았을 때 사용) ──
+# 한국 주요 대형주 (kr-market 기본 수집 대상)
+KR_MAJOR_TICKERS = {
+    "005930": "삼성전자", "000660": "SK하이닉스",
+    "373220": "LG에너지솔루션", "005380": "현대차",
+    "035420": "NAVER", "035720": "카카오",
+    "006400": "삼성SDI", "207940": "삼성바이오로직스",
+    "068270": "셀트리온", "005490": "POSCO홀딩스",
+}
+
+# 미국 지수 / 주요 빅테크 (us-market 기본 수집 대상)
+US_INDEX_SYMBOLS = {"^GSPC": "S&P500", "^IXIC": "NASDAQ", "^DJI": "DOW"}
+US_TECH_SYMBOLS = {
+    "AAPL": "Apple", "MSFT": "Microsoft", "NVDA": "NVIDIA",
+    "TSLA": "Tesla", "GOOGL": "Google", "AMZN": "Amazon",
+    "META": "Meta", "AMD": "AMD", "AVGO": "Broadcom",
+}
+
+# 환율/원자재/변동성 (forex 기본 수집 대상)
+FOREX_SYMBOLS = {
+    "KRW=X": "USD/KRW",
+    "GC=F": "Gold",
+    "CL=F": "WTI_Oil",
+    "BTC-USD": "Bitcoin",
+    "^VIX": "VIX_공포지수",
+    "^TNX": "미국10년국채금리",
 }
 
+# Seeking Alpha 레이팅 조회 종목
+SA_SYMBOLS = ["NVDA", "AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "META", "AMD", "AVGO"]
+
+# 뉴스 헤드라인 / Tavily 검색 키워드
+NEWS_KEYWORDS = [
+    "금리", "인플레이션", "반도체", "실적발표", "외국인 매수",
+    "AI 인공지능", "환율", "유가", "연준 Fed", "코스피",
+    "나스닥", "삼성전자", "SK하이닉스", "테슬라", "엔비디아",
+]
+TAVILY_KEYWORDS = [
+    "한국 증시 코스피 오늘",
+    "미국 증시 나스닥 S&P500",
+    "반도체 AI 엔비디아 SK하이닉스",
+    "환율 원달러 금리 연준",
+    "삼성전자 테슬라 실적",
+]
+
 # 한국 주요 기업명 → 티커 코드 매핑 (헤드라인 추출 기업 데이터 조회용)
 KR_NAME_TO_TICKER = {
     "삼성전자": "005930", "SK하이닉스": "000660", "LG에너지솔루션": "373220",
@@ -44,6 +122,731 @@ KR_NAME_TO_TICKER = {
 }
 
 
+# ============================================================
+# 0. 응답 스냅샷 캐시 (orjson 직렬화 + gzip/brotli 압축 + ETag)
+# ============================================================
+SNAPSHOT_TTL = int(os.environ.get("SNAPSHOT_TTL", "60"))  # 초
+SNAPSHOT_MAX_KEYS = 256
+COMPRESS_MIN_BYTES = 512
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+# 버전 계산에서 제외하는 생성 시각 필드 (내용이 같으면 기존 스냅샷·시각 유지 → ETag/웹훅 불변)
+_VERSION_IGNORED_FIELDS = {"generated_at"}
+
+
+def _dump_json(data) -> bytes:
+    """orjson 직렬화 (numpy 스칼라/비문자열 키 허용, 실패 시 표준 json 폴백)"""
+    try:
+        return orjson.dumps(data, option=_ORJSON_OPTS)
+    except TypeError:
+        return json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _content_version(data) -> str:
+    """데이터 내용 기반 버전 토큰 (같은 내용이면 같은 버전 → ETag 유지)"""
+    if is_dataclass(data):
+        data = {f.name: getattr(data, f.name) for f in fields(data) if f.name not in _VERSION_IGNORED_FIELDS}
+    if isinstance(data, str):
+        raw = data.encode("utf-8")
+    else:
+        try:
+            raw = orjson.dumps(data, option=_ORJSON_OPTS | orjson.OPT_SORT_KEYS)
+        except TypeError:
+            raw = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+class Snapshot:
+    """수집 결과 1건 + 버전 + 인코딩별 직렬화 바이트 캐시"""
+    __slots__ = ("key", "version", "data", "created_at", "expires_at", "_encoded")
+
+    def __init__(self, key: str, version: str, data, ttl: float):
+        self.key = key
+        self.version = version
+        self.data = data
+        self.created_at = datetime.now()
+        self.expires_at = time.monotonic() + ttl
+        self._encoded: dict[str, tuple[str, bytes]] = {}
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def encoded(self, encoding: str) -> tuple[str, bytes]:
+        """(실제 적용된 인코딩, 바디) — 버전당 1회만 직렬화/압축"""
+        cached = self._encoded.get(encoding)
+        if cached is not None:
+            return cached
+        if "identity" in self._encoded:
+            body = self._encoded["identity"][1]
+        elif isinstance(self.data, str):
+            body = self.data.encode("utf-8")
+        else:
+            body = _dump_json(self.data)
+        result = ("identity", body)
+        if encoding != "identity" and len(body) >= COMPRESS_MIN_BYTES:
+            if encoding == "br" and brotli is not None:
+                result = ("br", brotli.compress(body, quality=5))
+            elif encoding == "gzip":
+                result = ("gzip", gzip.compress(body, compresslevel=6, mtime=0))
+        self._encoded["identity"] = ("identity", body)
+        self._encoded[encoding] = result
+        return result
+
+
+class SnapshotStore:
+    """키별 최신 스냅샷 보관 (TTL 내 재사용, 동시 빌드는 1회로 합침)"""
+
+    def __init__(self, max_keys: int = SNAPSHOT_MAX_KEYS):
+        self._entries: OrderedDict[str, Snapshot] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._max_keys = max_keys
+        self.listeners: list = []  # 새 버전 스냅샷 생성 시 호출 (snap) → None
+
+    def peek(self, key: str) -> Snapshot | None:
+        return self._entries.get(key)
+
+    async def get(self, key: str, builder, ttl: float | None = None) -> Snapshot:
+        snap = self._entries.get(key)
+        if snap is not None and snap.fresh:
+            self._entries.move_to_end(key)
+            return snap
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            snap = self._entries.get(key)
+            if snap is not None and snap.fresh:
+                return snap
+
+            data = await builder()
+            version = _content_version(data)
+            if ttl is None:
+                ttl = snapshot_ttl(key)
+            if snap is not None and snap.version == version:
+                # 내용이 그대로면 기존 스냅샷(직렬화 캐시 포함) 수명만 연장
+                snap.expires_at = time.monotonic() + ttl
+                return snap
+
+            snap = Snapshot(key, version, data, ttl)
+            self._entries[key] = snap
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_keys:
+                old_key, _ = self._entries.popitem(last=False)
+                self._locks.pop(old_key, None)
+            for listener in self.listeners:
+                try:
+                    listener(snap)
+                except Exception:
+                    continue
+            return snap
+
+
+snapshot_store = SnapshotStore()
+
+
+def _negotiate_encoding(accept_encoding: str) -> str:
+    """Accept-Encoding 협상 (q값 반영, br > gzip > identity)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    def _q(name: str) -> float:
+        return accepted.get(name, accepted.get("*", 0.0))
+
+    if brotli is not None and _q("br") > 0:
+        return "br"
+    if _q("gzip") > 0:
+        return "gzip"
+    return "identity"
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def snapshot_response(request: Request, snap: Snapshot,
+                      media_type: str = "application/json") -> Response:
+    """스냅샷을 HTTP 응답으로 변환 (If-None-Match 일치 시 304)"""
+    etag = f'W/"{snap.version}"'
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding, body = snap.encoded(_negotiate_encoding(request.headers.get("accept-encoding", "")))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+async def cached_response(request: Request, key: str, builder,
+                          ttl: float | None = None,
+                          media_type: str = "application/json") -> Response:
+    snap = await snapshot_store.get(key, builder, ttl)
+    return snapshot_response(request, snap, media_type)
+
+
+# ============================================================
+# 0-2. 업스트림 서킷 브레이커 (장애 중인 공급자는 타임아웃 대기 없이 즉시 건너뜀)
+# ============================================================
+BREAKER_WINDOW = 20             # 최근 호출 결과 보관 수
+BREAKER_MIN_CALLS = 5           # 실패율 판정 최소 호출 수
+BREAKER_FAILURE_RATE = 0.5      # 이 비율 이상 실패 시 open
+BREAKER_OPEN_SECONDS = 30       # open 유지 시간 (이후 half-open 탐침)
+BREAKER_HALF_OPEN_PROBES = 1    # half-open 상태 동시 탐침 수
+BREAKER_CACHE_SIZE = 256        # 브레이커별 마지막 성공 결과 보관 수
+
+
+class CircuitOpenError(Exception):
+    """브레이커가 열려 있어 호출을 건너뜀 (캐시된 결과도 없음)"""
+
+
+class UpstreamEmptyError(Exception):
+    """업스트림이 오류를 삼키고 빈 결과만 돌려줌 (브레이커에 실패로 집계, 캐시하지 않음)"""
+
+
+class CircuitBreaker:
+    """공급자/엔드포인트 단위 closed → open → half-open 상태 머신 (스레드 안전)"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        self._results = deque(maxlen=BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._cache: OrderedDict = OrderedDict()
+        self.stats = {"calls": 0, "failures": 0, "short_circuited": 0, "served_from_cache": 0, "opened": 0}
+        self.last_error = ""
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < BREAKER_OPEN_SECONDS:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= BREAKER_HALF_OPEN_PROBES:
+                    return False
+                self._probes += 1
+            self.stats["calls"] += 1
+            return True
+
+    def _record(self, ok: bool, error: Exception | None = None):
+        with self._lock:
+            if not ok:
+                self.stats["failures"] += 1
+                self.last_error = f"{type(error).__name__}: {error}"[:200]
+            if self.state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok:
+                    self.state = self.CLOSED
+                    self._results.clear()
+                else:
+                    self._trip()
+                return
+            self._results.append(ok)
+            failures = self._results.count(False)
+            if len(self._results) >= BREAKER_MIN_CALLS and failures / len(self._results) >= BREAKER_FAILURE_RATE:
+                self._trip()
+
+    def _trip(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self.stats["opened"] += 1
+
+    def call(self, fn, *args, cache_key=None, **kwargs):
+        """fn 실행 — open 상태면 마지막 성공 결과(cache_key 기준)를 즉시 반환하거나 CircuitOpenError"""
+        if not self._allow():
+            with self._lock:
+                self.stats["short_circuited"] += 1
+                if cache_key is not None and cache_key in self._cache:
+                    self.stats["served_from_cache"] += 1
+                    return self._cache[cache_key]
+            raise CircuitOpenError(self.name)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(False, e)
+            raise
+        self._record(True)
+        if cache_key is not None:
+            with self._lock:
+                self._cache[cache_key] = result
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > BREAKER_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self.state
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, BREAKER_OPEN_SECONDS - (time.monotonic() - self._opened_at)), 1)
+            recent = list(self._results)
+            return {
+                "name": self.name,
+                "state": state,
+                "recent_failure_rate": round(recent.count(False) / len(recent), 2) if recent else 0.0,
+                "retry_in_seconds": retry_in,
+                "last_error": self.last_error,
+                **self.stats,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """공급자:엔드포인트 이름별 브레이커 (최초 사용 시 생성)"""
+    b = _breakers.get(name)
+    if b is None:
+        b = _breakers.setdefault(name, CircuitBreaker(name))
+    return b
+
+
+def yf_history(symbol: str, **kwargs):
+    """yfinance Ticker.history (타임아웃 + yahoo:history 브레이커, 빈 응답은 실패)"""
+    import yfinance as yf
+    kwargs.setdefault("timeout", 10)
+
+    def fetch():
+        # yfinance는 네트워크 오류를 삼키고 빈 DataFrame을 반환
+        df = yf.Ticker(symbol).history(**kwargs)
+        if df is None or df.empty:
+            raise UpstreamEmptyError(f"yahoo history 빈 응답: {symbol}")
+        return df
+
+    return breaker("yahoo:history").call(fetch, cache_key=(symbol, tuple(sorted(kwargs.items()))))
+
+
+YAHOO_HOST = "finance.yahoo.com"
+KRX_HOST = "data.krx.co.kr"     # pykrx 호출은 모두 블로킹 → run_on_host로 스레드에서 실행
+YF_DOWNLOAD_THREADS = 16
+_yf_download_lock = threading.Lock()  # yf.download는 모듈 전역 결과 버퍼를 써서 동시 호출 불가
+
+
+def yf_download(symbols, **kwargs) -> dict:
+    """여러 심볼 일봉을 1회 일괄 요청 (yfinance 내부 스레드로 분할, yahoo:download 브레이커) → {심볼: DataFrame}
+    브레이커가 열려 있으면 같은 심볼/인자의 마지막 성공 결과를 반환"""
+    import yfinance as yf
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    kwargs.setdefault("timeout", 10)
+
+    def fetch() -> dict:
+        # 실패 심볼은 예외 대신 빈 프레임으로 옴 → 요청한 심볼이 전부 비면 장애로 판단
+        raw = yf.download(symbols, auto_adjust=True, progress=False, group_by="ticker",
+                          threads=min(YF_DOWNLOAD_THREADS, len(symbols)), **kwargs)
+        frames = {} if raw is None or raw.empty else {
+            s: raw[s].dropna(how="all") for s in raw.columns.get_level_values(0).unique()
+        }
+        if not any(not frames[s].empty for s in symbols if s in frames):
+            raise UpstreamEmptyError(f"yahoo download 빈 응답: {len(symbols)}개 심볼")
+        return frames
+
+    with _yf_download_lock:
+        return breaker("yahoo:download").call(
+            fetch, cache_key=(tuple(sorted(symbols)), tuple(sorted(kwargs.items()))),
+        )
+
+
+def tavily_search(client, **kwargs) -> dict:
+    """Tavily 검색 (tavily:search 브레이커)"""
+    return breaker("tavily:search").call(
+        client.search, cache_key=tuple(sorted(kwargs.items())), **kwargs,
+    )
+
+
+@app.get("/api/breakers")
+async def get_breakers():
+    """업스트림 서킷 브레이커 상태 (모니터링용)"""
+    return {"breakers": [b.snapshot() for b in _breakers.values()]}
+
+
+# ============================================================
+# 0-3. 거래소 달력 (KRX / NYSE 휴장일·단축/지연 개장 — 네트워크 없이 거래일 계산)
+# ============================================================
+MARKET_SETTLE_SECONDS = 3600  # 장 마감 후 확정치(수급/종가 보정) 반영 대기 시간
+
+# KRX 휴장일 (주말 제외). 음력 명절·대체공휴일·선거일처럼 규칙으로 계산할 수 없는 날짜 포함.
+# 표에 없는 연도는 양력 고정 공휴일만 적용되므로 연초에 다음 해 공고분을 추가할 것.
+KRX_HOLIDAYS = {
+    2024: ["0101", "0209", "0212", "0301", "0410", "0501", "0506", "0515", "0606",
+           "0815", "0916", "0917", "0918", "1001", "1003", "1009", "1225", "1231"],
+    2025: ["0101", "0127", "0128", "0129", "0130", "0303", "0501", "0505", "0506",
+           "0603", "0606", "0815", "1003", "1006", "1007", "1008", "1009", "1225", "1231"],
+    2026: ["0101", "0216", "0217", "0218", "0302", "0501", "0505", "0525", "0603",
+           "0817", "0924", "0925", "1005", "1009", "1225", "1231"],
+    2027: ["0101", "0208", "0209", "0301", "0505", "0513", "0816", "0914", "0915",
+           "0916", "1004", "1011", "1227", "1231"],
+}
+KRX_FIXED_HOLIDAYS = ["0101", "0301", "0501", "0505", "0606", "0815", "1003", "1009", "1225", "1231"]
+# 수능일: 10:00 개장 / 16:30 마감
+KRX_CSAT_DAYS = {"20241114", "20251113", "20261119"}
+# NYSE 임시 휴장 (국가 애도일 등)
+NYSE_SPECIAL_CLOSURES = {"20250109"}
+
+
+def _easter(year: int):
+    """그레고리력 부활절 (익명 알고리즘)"""
+    from datetime import date
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int):
+    """month의 n번째 weekday (n=-1이면 마지막)"""
+    from datetime import date
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+@functools.lru_cache(maxsize=32)
+def _krx_holidays(year: int) -> frozenset:
+    from datetime import date
+    days = KRX_HOLIDAYS.get(year, KRX_FIXED_HOLIDAYS)
+    return frozenset(date(year, int(d[:2]), int(d[2:])) for d in days)
+
+
+@functools.lru_cache(maxsize=32)
+def _nyse_holidays(year: int) -> frozenset:
+    from datetime import date
+
+    def observed(d):
+        return d - timedelta(days=1) if d.weekday() == 5 else d + timedelta(days=1) if d.weekday() == 6 else d
+
+    days = {
+        _nth_weekday(year, 1, 0, 3),                  # MLK Day
+        _nth_weekday(year, 2, 0, 3),                  # Presidents' Day
+        _easter(year) - timedelta(days=2),            # Good Friday
+        _nth_weekday(year, 5, 0, -1),                 # Memorial Day
+        observed(date(year, 7, 4)),                   # Independence Day
+        _nth_weekday(year, 9, 0, 1),                  # Labor Day
+        _nth_weekday(year, 11, 3, 4),                 # Thanksgiving
+        observed(date(year, 12, 25)),                 # Christmas
+    }
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:                       # 토요일 신정은 전년 12/31로 대체하지 않음
+        days.add(observed(new_year))
+    if year >= 2022:
+        days.add(observed(date(year, 6, 19)))         # Juneteenth
+    days |= {datetime.strptime(d, "%Y%m%d").date() for d in NYSE_SPECIAL_CLOSURES if d.startswith(str(year))}
+    return frozenset(days)
+
+
+class TradingCalendar:
+    """거래소 세션 계산 (휴장일 + 정규장 시간 + 특수 개장/마감 시간)"""
+
+    def __init__(self, name: str, tz: str, open_hm: tuple[int, int], close_hm: tuple[int, int],
+                 holidays, special_hours):
+        from zoneinfo import ZoneInfo
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open_hm = open_hm
+        self.close_hm = close_hm
+        self._holidays = holidays
+        self._special_hours = special_hours
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def is_session(self, d) -> bool:
+        return d.weekday() < 5 and d not in self._holidays(d.year)
+
+    def previous_session(self, d):
+        """d 이전(당일 제외) 마지막 거래일"""
+        d -= timedelta(days=1)
+        while not self.is_session(d):
+            d -= timedelta(days=1)
+        return d
+
+    def next_session(self, d):
+        """d 이후(당일 제외) 첫 거래일"""
+        d += timedelta(days=1)
+        while not self.is_session(d):
+            d += timedelta(days=1)
+        return d
+
+    def last_session(self, now: datetime | None = None):
+        """이미 개장한(데이터가 있는) 가장 최근 거래일"""
+        now = (now or self.now()).astimezone(self.tz)
+        d = now.date()
+        if self.is_session(d) and now >= self.session_hours(d)[0]:
+            return d
+        return self.previous_session(d)
+
+    def sessions_back(self, end, count: int):
+        """end 포함 count번째 거래일 (end가 휴장일이면 직전 거래일부터 셈)"""
+        d = end if self.is_session(end) else self.previous_session(end)
+        for _ in range(max(count, 1) - 1):
+            d = self.previous_session(d)
+        return d
+
+    def session_hours(self, d) -> tuple[datetime, datetime]:
+        open_hm, close_hm = self._special_hours(self, d) or (self.open_hm, self.close_hm)
+        base = datetime(d.year, d.month, d.day, tzinfo=self.tz)
+        return (base.replace(hour=open_hm[0], minute=open_hm[1]),
+                base.replace(hour=close_hm[0], minute=close_hm[1]))
+
+    def is_open(self, now: datetime | None = None) -> bool:
+        now = (now or self.now()).astimezone(self.tz)
+        if not self.is_session(now.date()):
+            return False
+        opened, closed = self.session_hours(now.date())
+        return opened <= now < closed
+
+    def is_settled(self, d, now: datetime | None = None) -> bool:
+        """d 세션이 마감 후 확정 대기 시간까지 지나 데이터가 더 바뀌지 않는지"""
+        now = (now or self.now()).astimezone(self.tz)
+        return now >= self.session_hours(d)[1] + timedelta(seconds=MARKET_SETTLE_SECONDS)
+
+    def seconds_until_change(self, now: datetime | None = None) -> float:
+        """다음에 데이터가 바뀔 수 있는 시점(장중이면 0, 아니면 다음 개장)까지 남은 초"""
+        now = (now or self.now()).astimezone(self.tz)
+        today = now.date()
+        if self.is_session(today):
+            opened, closed = self.session_hours(today)
+            if now < opened:
+                return (opened - now).total_seconds()
+            if now < closed + timedelta(seconds=MARKET_SETTLE_SECONDS):
+                return 0.0
+        return (self.session_hours(self.next_session(today))[0] - now).total_seconds()
+
+
+def _krx_special_hours(cal: TradingCalendar, d):
+    if d.strftime("%Y%m%d") in KRX_CSAT_DAYS:
+        return (10, 0), (16, 30)
+    if cal.previous_session(d).year < d.year:         # 새해 첫 거래일 10:00 개장
+        return (10, 0), (15, 30)
+    return None
+
+
+def _nyse_special_hours(cal: TradingCalendar, d):
+    # 독립기념일 전날 / 추수감사절 다음날 / 크리스마스 이브 13:00 조기 마감
+    early = (
+        (d.month == 7 and d.day == 3 and d.weekday() <= 3)
+        or d == _nth_weekday(d.year, 11, 3, 4) + timedelta(days=1)
+        or (d.month == 12 and d.day == 24 and d.weekday() <= 3)
+    )
+    return ((9, 30), (13, 0)) if early else None
+
+
+KRX = TradingCalendar("KRX", "Asia/Seoul", (9, 0), (15, 30), _krx_holidays, _krx_special_hours)
+NYSE = TradingCalendar("NYSE", "America/New_York", (9, 30), (16, 0), _nyse_holidays, _nyse_special_hours)
+
+
+def market_ttl(calendar: TradingCalendar) -> float:
+    """장중/마감 직후엔 SNAPSHOT_TTL, 휴장 중엔 다음 개장까지 캐시 유지"""
+    return max(float(SNAPSHOT_TTL), calendar.seconds_until_change())
+
+
+# 장 데이터만 담는 스냅샷 키 → 달력 (뉴스/환율(BTC 포함)은 주말에도 바뀌므로 제외)
+SNAPSHOT_CALENDARS = {"kr-market": KRX, "us-market": NYSE}
+
+
+def snapshot_ttl(key: str) -> float:
+    calendar = SNAPSHOT_CALENDARS.get(key.split(":", 1)[0])
+    return market_ttl(calendar) if calendar is not None else float(SNAPSHOT_TTL)
+
+
+@app.get("/api/market-calendar")
+async def get_market_calendar():
+    """KRX/NYSE 현재 세션 정보"""
+    result = {}
+    for cal in (KRX, NYSE):
+        last = cal.last_session()
+        result[cal.name] = {
+            "is_open": cal.is_open(),
+            "last_session": last.isoformat(),
+            "previous_session": cal.previous_session(last).isoformat(),
+            "next_session": cal.next_session(cal.now().date()).isoformat(),
+            "session_hours": [t.strftime("%H:%M") for t in cal.session_hours(last)],
+        }
+    return result
+
+
+# ============================================================
+# 0-4. 관심 목록 (watchlists.json — 수정하면 재시작 없이 반영, 요청별 이름으로 선택)
+# ============================================================
+WATCHLISTS_PATH = os.environ.get("WATCHLISTS_PATH", "watchlists.json")
+WATCHLIST_CHECK_SECONDS = 2     # 파일 변경(mtime) 확인 최소 간격
+DEFAULT_WATCHLIST = "default"
+
+
+@dataclass(frozen=True, slots=True)
+class Watchlist:
+    """수집 대상 묶음 (파일에서 지정하지 않은 항목은 상위 목록을 상속)"""
+    name: str
+    kr_stocks: dict             # 종목코드 → 이름
+    us_indices: dict            # 심볼 → 이름
+    us_stocks: dict             # 심볼 → 이름
+    forex: dict                 # 심볼 → 이름
+    sa_symbols: tuple
+    news_keywords: tuple
+    tavily_keywords: tuple
+
+    def cache_key(self, base: str) -> str:
+        """스냅샷 키 (default는 기존 키 그대로, 그 외는 @이름 접미사)"""
+        return base if self.name == DEFAULT_WATCHLIST else f"{base}@{self.name}"
+
+
+_WATCHLIST_FIELDS = {
+    "kr_stocks": dict, "us_indices": dict, "us_stocks": dict, "forex": dict,
+    "sa_symbols": tuple, "news_keywords": tuple, "tavily_keywords": tuple,
+}
+
+
+def _builtin_watchlist() -> Watchlist:
+    return Watchlist(
+        DEFAULT_WATCHLIST, dict(KR_MAJOR_TICKERS), dict(US_INDEX_SYMBOLS), dict(US_TECH_SYMBOLS),
+        dict(FOREX_SYMBOLS), tuple(SA_SYMBOLS), tuple(NEWS_KEYWORDS), tuple(TAVILY_KEYWORDS),
+    )
+
+
+def _parse_watchlists(raw: dict) -> dict[str, Watchlist]:
+    """{"이름": {"extends": "상위", 항목...}} → Watchlist (default는 내장 목록, 나머지는 default를 상속)"""
+    if not isinstance(raw, dict):
+        raise ValueError("최상위는 객체여야 합니다")
+    builtin = _builtin_watchlist()
+    lists: dict[str, Watchlist] = {}
+
+    def build(name: str, chain: tuple = ()) -> Watchlist:
+        if name in lists:
+            return lists[name]
+        if name in chain:
+            raise ValueError(f"순환 상속: {' → '.join((*chain, name))}")
+        if name != DEFAULT_WATCHLIST and name not in raw:
+            raise ValueError(f"정의되지 않은 목록: {name}")
+        spec = raw.get(name) or {}
+        unknown = set(spec) - set(_WATCHLIST_FIELDS) - {"extends"}
+        if unknown:
+            raise ValueError(f"{name}: 알 수 없는 항목 {sorted(unknown)}")
+        parent_name = spec.get("extends", None if name == DEFAULT_WATCHLIST else DEFAULT_WATCHLIST)
+        parent = builtin if parent_name is None else build(parent_name, (*chain, name))
+        values = {}
+        for field_name, kind in _WATCHLIST_FIELDS.items():
+            if field_name not in spec:
+                values[field_name] = getattr(parent, field_name)
+            elif kind is dict:
+                value = spec[field_name]
+                # 대량 목록은 이름 없이 심볼 배열로도 지정 가능
+                items = value.items() if isinstance(value, dict) else ((v, v) for v in value)
+                values[field_name] = {str(k): str(v) for k, v in items}
+            else:
+                values[field_name] = tuple(str(v) for v in spec[field_name])
+        lists[name] = Watchlist(name, **values)
+        return lists[name]
+
+    for name in (DEFAULT_WATCHLIST, *raw):
+        build(name)
+    return lists
+
+
+class WatchlistRegistry:
+    """watchlists.json 핫 리로드 (mtime 변경 시 재적재, 파싱 실패 시 직전 목록 유지)"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._mtime: int | None = None
+        self._checked_at = float("-inf")
+        self._lists = {DEFAULT_WATCHLIST: _builtin_watchlist()}
+        self.loaded_at: datetime | None = None
+        self.error: str | None = None
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < WATCHLIST_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        if mtime is None:
+            self._lists, self.error = {DEFAULT_WATCHLIST: _builtin_watchlist()}, None
+            return
+        try:
+            with open(self._path, "rb") as f:
+                self._lists = _parse_watchlists(orjson.loads(f.read()))
+            self.loaded_at, self.error = datetime.now(), None
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    def get(self, name: str | None = None) -> Watchlist:
+        self._maybe_reload()
+        return self._lists[name or DEFAULT_WATCHLIST]
+
+    def all(self) -> dict[str, Watchlist]:
+        self._maybe_reload()
+        return dict(self._lists)
+
+
+watchlists = WatchlistRegistry(WATCHLISTS_PATH)
+
+
+def resolve_watchlist(name: str | None) -> Watchlist:
+    try:
+        return watchlists.get(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"관심 목록 없음: {name}")
+
+
+@app.get("/api/watchlists")
+async def list_watchlists():
+    """관심 목록 이름별 항목 수 (+ 마지막 적재 시각/오류)"""
+    lists = watchlists.all()
+    return {
+        "path": WATCHLISTS_PATH,
+        "loaded_at": watchlists.loaded_at.isoformat() if watchlists.loaded_at else None,
+        "error": watchlists.error,
+        "watchlists": {
+            name: {field_name: len(getattr(wl, field_name)) for field_name in _WATCHLIST_FIELDS}
+            for name, wl in lists.items()
+        },
+    }
+
+
 # ============================================================
 # 1. 한국 증시 데이터 수집 (pykrx)
 # ============================================================
@@ -68,18 +871,23 @@ def _patch_pykrx_index_name():
 _patch_pykrx_index_name()
 
 
-@app.get("/api/kr-market")
-async def get_kr_market_data(days: int = 5):
-    """한국 증시 데이터 (KOSPI/KOSDAQ 지수 + 주요 종목 + 거래대금/등락률 상위)"""
+async def get_kr_market_data(days: int = 5, watchlist: Watchlist | None = None):
+    """한국 증시 데이터 (KOSPI/KOSDAQ 지수 + 관심 종목 + 거래대금/등락률 상위)"""
     try:
         from pykrx import stock as krx
 
-        today = datetime.now().strftime("%Y%m%d")
-        start = (datetime.now() - timedelta(days=days + 10)).strftime("%Y%m%d")
+        wl = watchlist or watchlists.get()
+
+        # 휴장일을 건너뛴 정확한 거래일 범위 (전일 대비 계산용으로 최소 2세션)
+        last = KRX.last_session()
+        today = last.strftime("%Y%m%d")
+        start = KRX.sessions_back(last, max(days, 2)).strftime("%Y%m%d")
 
         # KOSPI / KOSDAQ 지수
-        kospi = krx.get_index_ohlcv(start, today, "1001")
-        kosdaq = krx.get_index_ohlcv(start, today, "2001")
+        kospi, kosdaq = await asyncio.gather(
+            run_on_host(KRX_HOST, krx.get_index_ohlcv, start, today, "1001"),
+            run_on_host(KRX_HOST, krx.get_index_ohlcv, start, today, "2001"),
+        )
 
         # 지수 데이터
         kospi_result = None
@@ -103,95 +911,63 @@ async def get_kr_market_data(days: int = 5):
         # 최근 거래일
         recent_date = kospi.index[-1].strftime("%Y%m%d") if not kospi.empty else today
 
-        # 전종목 OHLCV (pykrx 1.2+: market 파라미터 제거)
-        vol_df = None
+        # 전종목 스냅샷 (거래일별 메모리 캐시, 스크리닝 API와 공유)
+        frame = None
         try:
-            vol_df = krx.get_market_ohlcv(recent_date)
+            frame = await get_krx_market_frame(recent_date)
         except Exception:
             pass
 
-        # 주요 대형주 (스토리 분석에 필수)
+        # 관심 종목 (전종목 프레임에서 조회하므로 종목 수와 무관하게 추가 요청 없음)
         major_kr_stocks = {}
-        KR_MAJOR_TICKERS = {
-            "005930": "삼성전자", "000660": "SK하이닉스",
-            "373220": "LG에너지솔루션", "005380": "현대차",
-            "035420": "NAVER", "035720": "카카오",
-            "006400": "삼성SDI", "207940": "삼성바이오로직스",
-            "068270": "셀트리온", "005490": "POSCO홀딩스",
-        }
-        if vol_df is not None and not vol_df.empty:
-            for ticker_code, name in KR_MAJOR_TICKERS.items():
-                try:
-                    if ticker_code in vol_df.index:
-                        row = vol_df.loc[ticker_code]
-                        major_kr_stocks[name] = {
-                            "ticker": ticker_code,
-                            "close": int(row["종가"]),
-                            "change_pct": round(float(row["등락률"]), 2),
-                            "volume": int(row["거래량"]),
-                            "market_cap": int(row["시가총액"]) if "시가총액" in vol_df.columns else None,
-                        }
-                except Exception:
+        if frame is not None:
+            for ticker_code, name in wl.kr_stocks.items():
+                row = frame.row(ticker_code)
+                if row is None:
                     continue
+                major_kr_stocks[name] = {
+                    "ticker": ticker_code,
+                    "close": row["close"],
+                    "change_pct": row["change_pct"],
+                    "volume": row["volume"],
+                    "market_cap": row["market_cap"],
+                }
 
-        # 거래대금 상위 10종목
-        top_volume = []
-        try:
-            if vol_df is not None and not vol_df.empty and "거래량" in vol_df.columns:
-                vol_sorted = vol_df.nlargest(10, "거래량")
-                for ticker_code in vol_sorted.index:
-                    name = krx.get_market_ticker_name(ticker_code)
-                    row = vol_sorted.loc[ticker_code]
-                    top_volume.append({
-                        "ticker": ticker_code,
-                        "name": name,
-                        "close": int(row["종가"]),
-                        "change_pct": round(float(row["등락률"]), 2),
-                        "volume": int(row["거래량"]),
-                    })
-        except Exception:
-            pass
-
-        # 등락률 상위 10종목 (상승)
-        top_gainers = []
-        try:
-            if vol_df is not None and not vol_df.empty and "등락률" in vol_df.columns:
-                gain_sorted = vol_df.nlargest(10, "등락률")
-                for ticker_code in gain_sorted.index:
-                    name = krx.get_market_ticker_name(ticker_code)
-                    row = gain_sorted.loc[ticker_code]
-                    top_gainers.append({
-                        "ticker": ticker_code,
-                        "name": name,
-                        "close": int(row["종가"]),
-                        "change_pct": round(float(row["등락률"]), 2),
-                        "volume": int(row["거래량"]),
-                    })
-        except Exception:
-            pass
+        # 거래대금 상위 / 등락률 상위·하위 10종목 (KOSPI, 사전 정렬 인덱스 사용)
+        top_volume, top_gainers, top_losers = [], [], []
+        if frame is not None:
+            movers_fields = ("ticker", "name", "close", "change_pct", "volume")
+            for target, sort, ascending in (
+                (top_volume, "volume", False),
+                (top_gainers, "change", False),
+                (top_losers, "change", True),
+            ):
+                try:
+                    hits = frame.screen(market="KOSPI", sort=sort, ascending=ascending, limit=10)["results"]
+                    target.extend({k: s[k] for k in movers_fields} for s in hits)
+                except Exception:
+                    pass
 
-        # 등락률 하위 10종목 (하락)
-        top_losers = []
+        # 추세 지표 (5/20/60일 수익률, 52주 고저, 연속일, 거래량, MA 크로스)
         try:
-            if vol_df is not None and not vol_df.empty and "등락률" in vol_df.columns:
-                loss_sorted = vol_df.nsmallest(10, "등락률")
-                for ticker_code in loss_sorted.index:
-                    name = krx.get_market_ticker_name(ticker_code)
-                    row = loss_sorted.loc[ticker_code]
-                    top_losers.append({
-                        "ticker": ticker_code,
-                        "name": name,
-                        "close": int(row["종가"]),
-                        "change_pct": round(float(row["등락률"]), 2),
-                        "volume": int(row["거래량"]),
-                    })
+            # 재적재는 종목별 히스토리 요청이라 이벤트 루프 밖에서 실행
+            trends = await asyncio.get_running_loop().run_in_executor(
+                _upstream_executor, _update_kr_trends, recent_date, kospi, kosdaq, frame, wl)
+            if kospi_result:
+                kospi_result["trend"] = trends.get("KOSPI")
+            if kosdaq_result:
+                kosdaq_result["trend"] = trends.get("KOSDAQ")
+            for ticker_code, name in wl.kr_stocks.items():
+                if name in major_kr_stocks:
+                    major_kr_stocks[name]["trend"] = trends.get(ticker_code)
         except Exception:
             pass
 
         # 투자자별 순매수 (외국인 라벨 수정)
         investor_data = {}
         try:
-            inv = krx.get_market_trading_value_by_investor(recent_date, recent_date, "KOSPI")
+            inv = await run_on_host(KRX_HOST, krx.get_market_trading_value_by_investor,
+                                    recent_date, recent_date, "KOSPI")
             if not inv.empty:
                 for label in ["외국인", "기관합계", "개인"]:
                     if label in inv.index and "순매수" in inv.columns:
@@ -214,24 +990,249 @@ async def get_kr_market_data(days: int = 5):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/kr-market")
+async def api_kr_market(request: Request, days: int = 5, since: str | None = None,
+                        watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    if since is not None:
+        # since 지정 시 섹션별 변경분만 (델타 버전은 default 목록, days=5 기준 데이터셋으로 관리)
+        if wl.name != DEFAULT_WATCHLIST:
+            raise HTTPException(status_code=400, detail="since는 default 관심 목록에서만 지원합니다")
+        result = await collect_delta(since or None, ["kr-market:5"])
+        return Response(content=_dump_json(result), media_type="application/json")
+    return await cached_response(request, wl.cache_key(f"kr-market:{days}"), lambda: get_kr_market_data(days, wl))
+
+
 # ============================================================
-# 2. 미국 증시 데이터 수집 (yfinance)
+# 1-2. KRX 전종목 컬럼형 스냅샷 + 스크리닝
 # ============================================================
-@app.get("/api/us-market")
-async def get_us_market_data(days: int = 5):
-    """미국 증시 데이터 (S&P500, NASDAQ + 주요 빅테크)"""
+KRX_FRAME_KEEP_DATES = 5
+KRX_SCREEN_SORTS = {
+    "change": "change_pct", "value": "value", "volume": "volume",
+    "market_cap": "market_cap", "close": "close",
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _kr_ticker_name(ticker_code: str) -> str:
+    from pykrx import stock as krx
     try:
-        import yfinance as yf
+        return krx.get_market_ticker_name(ticker_code)
+    except Exception:
+        return ticker_code
+
+
+class KrxMarketFrame:
+    """특정 거래일 전종목 OHLCV를 컬럼 배열로 보관 (int32/float32/범주형 시장)
+
+    정렬 키별 내림차순 인덱스를 미리 계산해 두고, 스크리닝은 불리언 마스크를
+    정렬 순서에 적용해 상위 N개만 꺼낸다."""
+    __slots__ = ("date", "built_at", "tickers", "market", "open", "high", "low",
+                 "close", "volume", "value", "change_pct", "market_cap",
+                 "_row_index", "_orders")
+
+    def __init__(self, date: str, df):
+        import numpy as np
+        import pandas as pd
+
+        self.date = date
+        self.built_at = time.monotonic()
+        self.tickers = df.index.to_numpy(dtype=object)
+        self.market = pd.Categorical(df["market"], categories=["KOSPI", "KOSDAQ", "KONEX"])
+        self.open = df["시가"].to_numpy(dtype=np.int32)
+        self.high = df["고가"].to_numpy(dtype=np.int32)
+        self.low = df["저가"].to_numpy(dtype=np.int32)
+        self.close = df["종가"].to_numpy(dtype=np.int32)
+        # 거래량/거래대금/시가총액은 int32 범위를 넘으므로 int64 유지
+        self.volume = df["거래량"].to_numpy(dtype=np.int64)
+        self.value = df["거래대금"].to_numpy(dtype=np.int64)
+        self.change_pct = df["등락률"].to_numpy(dtype=np.float32)
+        self.market_cap = df["시가총액"].fillna(-1).to_numpy(dtype=np.int64)
+        self._row_index = {t: i for i, t in enumerate(self.tickers)}
+        self._orders = {
+            sort: np.argsort(-getattr(self, attr).astype(np.float64), kind="stable").astype(np.int32)
+            for sort, attr in KRX_SCREEN_SORTS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def _record(self, i: int) -> dict:
+        cap = int(self.market_cap[i])
+        return {
+            "ticker": self.tickers[i],
+            "name": _kr_ticker_name(self.tickers[i]),
+            "market": self.market[i],
+            "open": int(self.open[i]),
+            "high": int(self.high[i]),
+            "low": int(self.low[i]),
+            "close": int(self.close[i]),
+            "change_pct": round(float(self.change_pct[i]), 2),
+            "volume": int(self.volume[i]),
+            "value": int(self.value[i]),
+            "market_cap": cap if cap >= 0 else None,
+        }
+
+    def row(self, ticker_code: str) -> dict | None:
+        i = self._row_index.get(ticker_code)
+        return None if i is None else self._record(i)
+
+    def screen(self, *, min_change: float | None = None, max_change: float | None = None,
+               min_value: int | None = None, min_cap: int | None = None,
+               max_cap: int | None = None, market: str | None = None,
+               tickers: list[str] | None = None, sort: str = "value",
+               ascending: bool = False, limit: int = 20) -> dict:
+        import numpy as np
+
+        if sort not in self._orders:
+            raise ValueError(f"sort must be one of {sorted(self._orders)}")
+
+        mask = np.ones(len(self), dtype=bool)
+        if min_change is not None:
+            mask &= self.change_pct >= min_change
+        if max_change is not None:
+            mask &= self.change_pct <= max_change
+        if min_value is not None:
+            mask &= self.value >= min_value
+        if min_cap is not None:
+            mask &= self.market_cap >= min_cap
+        if max_cap is not None:
+            mask &= (self.market_cap >= 0) & (self.market_cap <= max_cap)
+        if market:
+            if market.upper() not in self.market.categories:
+                raise ValueError(f"market must be one of {list(self.market.categories)}")
+            mask &= self.market.codes == self.market.categories.get_loc(market.upper())
+        if tickers:
+            picked = np.zeros(len(self), dtype=bool)
+            picked[[self._row_index[t] for t in tickers if t in self._row_index]] = True
+            mask &= picked
+
+        order = self._orders[sort]
+        if ascending:
+            order = order[::-1]
+        hits = order[mask[order]]
+        return {
+            "date": self.date,
+            "total_matches": int(hits.size),
+            "results": [self._record(int(i)) for i in hits[:limit]],
+        }
+
 
-        period = f"{max(days, 5)}d"
+_krx_frames: OrderedDict[str, KrxMarketFrame] = OrderedDict()
+_krx_frame_lock = asyncio.Lock()
+
+
+def _load_krx_market_frame(date: str) -> KrxMarketFrame:
+    """KOSPI/KOSDAQ 전종목 OHLCV + 시가총액을 받아 컬럼형 프레임 구성"""
+    import pandas as pd
+    from pykrx import stock as krx
+
+    parts = []
+    for market in ("KOSPI", "KOSDAQ"):
+        df = krx.get_market_ohlcv(date, market=market)
+        if df is None or df.empty:
+            continue
+        df = df.copy()
+        df["market"] = market
+        try:
+            cap = krx.get_market_cap(date, market=market)
+            df["시가총액"] = cap["시가총액"].reindex(df.index)
+        except Exception:
+            df["시가총액"] = float("nan")
+        parts.append(df)
+    if not parts:
+        raise HTTPException(status_code=404, detail=f"{date} 전종목 데이터 없음")
+    frame = KrxMarketFrame(date, pd.concat(parts))
+    # 종목명 조회는 pykrx가 첫 호출 때 전체 목록을 받아 두므로 여기(스레드)서 미리 채움
+    _kr_ticker_name(str(frame.tickers[0]))
+    return frame
+
+
+async def get_krx_market_frame(date: str) -> KrxMarketFrame:
+    """거래일별 전종목 프레임 (확정된 거래일은 영구 캐시, 장중/마감 직후는 SNAPSHOT_TTL마다 갱신)"""
+    frame = _krx_frames.get(date)
+    live = not KRX.is_settled(datetime.strptime(date, "%Y%m%d").date())
+    if frame is not None and not (live and time.monotonic() - frame.built_at > SNAPSHOT_TTL):
+        return frame
+    async with _krx_frame_lock:
+        frame = _krx_frames.get(date)
+        if frame is not None and not (live and time.monotonic() - frame.built_at > SNAPSHOT_TTL):
+            return frame
+        frame = await run_on_host(KRX_HOST, _load_krx_market_frame, date)
+        _krx_frames[date] = frame
+        _krx_frames.move_to_end(date)
+        while len(_krx_frames) > KRX_FRAME_KEEP_DATES:
+            _krx_frames.popitem(last=False)
+        return frame
+
+
+@app.get("/api/kr-screen")
+async def kr_screen(
+    date: str = "",
+    min_change: float | None = None,
+    max_change: float | None = None,
+    min_value: int | None = None,
+    min_cap: int | None = None,
+    max_cap: int | None = None,
+    market: str = "",
+    tickers: str = "",
+    sort: str = "value",
+    order: str = "desc",
+    limit: int = 20,
+):
+    """KRX 전종목 스크리닝 (등락률 범위, 최소 거래대금, 시총 구간, 시장, 티커 목록)"""
+    try:
+        if not date:
+            # 기본은 최근 거래일 (임의 날짜 조회로 적재된 프레임이 기본값이 되지 않도록)
+            latest = KRX.last_session().strftime("%Y%m%d")
+            if latest in _krx_frames:
+                date = latest
+            else:
+                # 최근 거래일 프레임이 없으면 kr-market 수집 기준일(데이터가 나온 최근 거래일)을 사용
+                date = (await snapshot_store.get("kr-market:5", lambda: get_kr_market_data(5))).data["date"]
+        frame = await get_krx_market_frame(date)
+
+        started = time.perf_counter()
+        result = frame.screen(
+            min_change=min_change, max_change=max_change, min_value=min_value,
+            min_cap=min_cap, max_cap=max_cap, market=market or None,
+            tickers=[t.strip() for t in tickers.split(",") if t.strip()] or None,
+            sort=sort, ascending=order.lower() == "asc", limit=max(1, min(limit, 500)),
+        )
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return Response(content=_dump_json(result), media_type="application/json")
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============================================================
+# 2. 미국 증시 데이터 수집 (yfinance)
+# ============================================================
+async def get_us_market_data(days: int = 5, watchlist: Watchlist | None = None):
+    """미국 증시 데이터 (S&P500, NASDAQ + 관심 종목)"""
+    try:
+        wl = watchlist or watchlists.get()
+        # yfinance period는 달력일 기준이라 연휴가 끼면 봉이 모자람 → 거래일 기준 start/end
+        last = NYSE.last_session()
+        # 지수 + 종목 전체를 1회 일괄 요청 (종목 수가 늘어도 요청 1회)
+        try:
+            histories = await run_on_host(
+                YAHOO_HOST, yf_download, [*wl.us_indices, *wl.us_stocks],
+                start=NYSE.sessions_back(last, max(days, 5)).isoformat(),
+                end=(last + timedelta(days=1)).isoformat(),
+            )
+        except Exception:
+            histories = {}  # 일괄 요청 실패(장애/브레이커 open + 캐시 없음) 시 빈 섹션
 
-        indices = {"^GSPC": "S&P500", "^IXIC": "NASDAQ", "^DJI": "DOW"}
         index_data = {}
-        for symbol, name in indices.items():
+        for symbol, name in wl.us_indices.items():
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period=period)
-                if not hist.empty and len(hist) > 1:
+                hist = histories.get(symbol)
+                if hist is not None and not hist.empty and len(hist) > 1:
                     latest = hist.iloc[-1]
                     prev = hist.iloc[-2]
                     index_data[name] = {
@@ -243,18 +1244,11 @@ async def get_us_market_data(days: int = 5):
             except Exception:
                 continue
 
-        tech_symbols = {
-            "AAPL": "Apple", "MSFT": "Microsoft", "NVDA": "NVIDIA",
-            "TSLA": "Tesla", "GOOGL": "Google", "AMZN": "Amazon",
-            "META": "Meta", "AMD": "AMD", "AVGO": "Broadcom",
-        }
-
         stocks = {}
-        for symbol, name in tech_symbols.items():
+        for symbol, name in wl.us_stocks.items():
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period=period)
-                if not hist.empty and len(hist) > 1:
+                hist = histories.get(symbol)
+                if hist is not None and not hist.empty and len(hist) > 1:
                     latest = hist.iloc[-1]
                     prev = hist.iloc[-2]
                     stocks[name] = {
@@ -267,6 +1261,18 @@ async def get_us_market_data(days: int = 5):
             except Exception:
                 continue
 
+        # 추세 지표 (5/20/60일 수익률, 52주 고저, 연속일, 거래량, MA 크로스)
+        try:
+            trends = await run_on_host(YAHOO_HOST, _update_us_trends, histories, wl)
+            for symbol, name in wl.us_indices.items():
+                if name in index_data:
+                    index_data[name]["trend"] = trends.get(symbol)
+            for symbol, name in wl.us_stocks.items():
+                if name in stocks:
+                    stocks[name]["trend"] = trends.get(symbol)
+        except Exception:
+            pass
+
         return {
             "indices": index_data,
             "major_stocks": stocks,
@@ -275,6 +1281,500 @@ async def get_us_market_data(days: int = 5):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/us-market")
+async def api_us_market(request: Request, days: int = 5, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    return await cached_response(request, wl.cache_key(f"us-market:{days}"), lambda: get_us_market_data(days, wl))
+
+
+# ============================================================
+# 2-2. 추세 지표 엔진 (일봉 히스토리 기반 롤링 통계)
+# ============================================================
+TREND_WINDOW = 252            # 52주 = 약 252 거래일
+TREND_HISTORY_SESSIONS = TREND_WINDOW + 5  # 최초 적재 시 조회할 거래일 수
+KRX_FETCH_CONCURRENCY = 8     # 히스토리 재적재 시 종목별 동시 요청 수
+
+
+class RollingStatsEngine:
+    """관심 종목 전체(심볼 × 거래일) 일봉을 링버퍼 행렬로 보관하고 추세 지표를 벡터 연산으로 유지.
+
+    새 거래일 봉은 열 하나만 추가하면서 이동평균 합계, 연속 상승/하락, 52주 고저를
+    증분 갱신한다. 같은 거래일 봉이 다시 들어오면(장중 갱신) 버퍼에서 상태를 재구성한다."""
+
+    RETURN_WINDOWS = (5, 20, 60)
+    MA_WINDOWS = (5, 20, 60)
+    VOLUME_WINDOW = 20
+
+    def __init__(self, symbols: list[str]):
+        import numpy as np
+
+        self.symbols = list(symbols)
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        n, w = len(self.symbols), TREND_WINDOW + 1
+        self._width = w
+        self._close = np.full((n, w), np.nan)
+        self._volume = np.full((n, w), np.nan)
+        self._head = -1
+        self._count = 0
+        self.last_date = None
+        self._stats = None
+        self._reset_state()
+
+    def _reset_state(self):
+        import numpy as np
+
+        n = len(self.symbols)
+        self._sum = {m: np.zeros(n) for m in self.MA_WINDOWS}
+        self._cnt = {m: np.zeros(n) for m in self.MA_WINDOWS}
+        self._vsum = np.zeros(n)
+        self._vcnt = np.zeros(n)
+        self._streak = np.zeros(n)
+        self._high = np.full(n, np.nan)
+        self._low = np.full(n, np.nan)
+        self._prev_diff = np.full(n, np.nan)
+
+    def _col(self, buf, offset: int):
+        """head 기준 offset 거래일 전 열"""
+        return buf[:, (self._head - offset) % self._width]
+
+    def _window(self, buf, length: int):
+        import numpy as np
+        cols = [(self._head - k) % self._width for k in range(min(length, self._count))]
+        return buf[:, cols] if cols else np.full((len(self.symbols), 1), np.nan)
+
+    def _vector(self, values: dict) -> "np.ndarray":
+        import numpy as np
+        vec = np.full(len(self.symbols), np.nan)
+        for symbol, value in values.items():
+            i = self._index.get(symbol)
+            if i is not None and value is not None:
+                vec[i] = value
+        return vec
+
+    def _ma_diff(self):
+        import numpy as np
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ma5 = np.where(self._cnt[5] == 5, self._sum[5] / self._cnt[5], np.nan)
+            ma20 = np.where(self._cnt[20] == 20, self._sum[20] / self._cnt[20], np.nan)
+        return ma5 - ma20
+
+    def load(self, dates: list, closes, volumes):
+        """초기 적재: closes/volumes는 (심볼 수 × 거래일) 행렬, dates 오름차순"""
+        import numpy as np
+
+        closes = np.asarray(closes, dtype=float)[:, -self._width:]
+        volumes = np.asarray(volumes, dtype=float)[:, -self._width:]
+        t = closes.shape[1]
+        self._close[:] = np.nan
+        self._volume[:] = np.nan
+        self._close[:, :t] = closes
+        self._volume[:, :t] = volumes
+        self._head = t - 1
+        self._count = t
+        self.last_date = dates[-1] if dates else None
+        self._rebuild()
+
+    def update(self, date, closes: dict, volumes: dict):
+        """거래일 봉 1개 반영 (새 거래일이면 증분 추가, 같은 거래일이면 마지막 봉 교체)"""
+        import numpy as np
+
+        if self.last_date is not None and date < self.last_date:
+            return
+        close_vec = self._vector(closes)
+        volume_vec = self._vector(volumes)
+        if date == self.last_date:
+            close_vec = np.where(np.isnan(close_vec), self._col(self._close, 0), close_vec)
+            self._close[:, self._head] = close_vec
+            self._volume[:, self._head] = volume_vec
+            self._rebuild()
+        else:
+            self._push(close_vec, volume_vec)
+        self.last_date = date
+
+    def _push(self, close_vec, volume_vec):
+        import numpy as np
+
+        if self._count:
+            prev_close = self._col(self._close, 0).copy()
+            # 결측(거래정지 등)은 직전 종가로 채워 수익률/연속일이 끊기지 않게 함
+            close_vec = np.where(np.isnan(close_vec), prev_close, close_vec)
+        else:
+            prev_close = np.full(len(self.symbols), np.nan)
+
+        # 새 열이 들어오면 각 윈도우에서 빠지는 값 (push 전 기준 offset m-1)
+        leaving = {m: self._col(self._close, m - 1).copy() for m in self.MA_WINDOWS}
+        leaving_volume = self._col(self._volume, self.VOLUME_WINDOW - 1).copy()
+        leaving_extreme = self._col(self._close, TREND_WINDOW - 1).copy()
+        self._prev_diff = self._ma_diff()
+
+        step = np.nan_to_num(np.sign(close_vec - prev_close))
+        self._streak = np.where(
+            step == 0, 0,
+            np.where(np.sign(self._streak) == step, self._streak + step, step),
+        )
+
+        self._head = (self._head + 1) % self._width
+        self._count = min(self._count + 1, self._width)
+        self._close[:, self._head] = close_vec
+        self._volume[:, self._head] = volume_vec
+
+        entered = ~np.isnan(close_vec)
+        for m in self.MA_WINDOWS:
+            left = ~np.isnan(leaving[m])
+            self._sum[m] += np.nan_to_num(close_vec) - np.nan_to_num(leaving[m])
+            self._cnt[m] += entered.astype(float) - left.astype(float)
+        self._vsum += np.nan_to_num(volume_vec) - np.nan_to_num(leaving_volume)
+        self._vcnt += (~np.isnan(volume_vec)).astype(float) - (~np.isnan(leaving_volume)).astype(float)
+
+        # 52주 고저: 빠지는 값이 극값이었던 행만 윈도우 재스캔
+        stale = (leaving_extreme == self._high) | (leaving_extreme == self._low)
+        self._high = np.fmax(self._high, close_vec)
+        self._low = np.fmin(self._low, close_vec)
+        if stale.any():
+            window = self._window(self._close, TREND_WINDOW)[stale]
+            self._high[stale] = np.fmax.reduce(window, axis=1)
+            self._low[stale] = np.fmin.reduce(window, axis=1)
+        self._stats = None
+
+    def _rebuild(self):
+        """버퍼 전체에서 상태 재계산 (초기 적재/같은 날 봉 교체 시)"""
+        import numpy as np
+
+        self._reset_state()
+        if not self._count:
+            return
+        for m in self.MA_WINDOWS:
+            window = self._window(self._close, m)
+            self._sum[m] = np.nansum(window, axis=1)
+            self._cnt[m] = (~np.isnan(window)).sum(axis=1).astype(float)
+        vwindow = self._window(self._volume, self.VOLUME_WINDOW)
+        self._vsum = np.nansum(vwindow, axis=1)
+        self._vcnt = (~np.isnan(vwindow)).sum(axis=1).astype(float)
+        window = self._window(self._close, TREND_WINDOW)
+        self._high = np.fmax.reduce(window, axis=1)
+        self._low = np.fmin.reduce(window, axis=1)
+
+        # 연속 상승/하락: 최근 봉부터 같은 방향이 이어지는 동안 누적
+        steps = np.nan_to_num(np.sign(window[:, :-1] - window[:, 1:])) if window.shape[1] > 1 else None
+        streak = np.zeros(len(self.symbols))
+        if steps is not None:
+            alive = steps[:, 0] != 0
+            direction = steps[:, 0]
+            for k in range(steps.shape[1]):
+                alive &= steps[:, k] == direction
+                streak += np.where(alive, direction, 0)
+        self._streak = streak
+
+        # 직전 봉 시점의 MA5-MA20 (크로스 판정용)
+        if self._count > 20:
+            prev = self._window(self._close, 21)[:, 1:]
+            with np.errstate(invalid="ignore"):
+                ma5 = np.where((~np.isnan(prev[:, :5])).sum(axis=1) == 5, np.nanmean(prev[:, :5], axis=1), np.nan)
+                ma20 = np.where((~np.isnan(prev)).sum(axis=1) == 20, np.nanmean(prev, axis=1), np.nan)
+            self._prev_diff = ma5 - ma20
+        self._stats = None
+
+    def stats(self) -> dict:
+        """심볼별 추세 지표 (한 번의 벡터 연산으로 전체 계산, 봉이 바뀔 때까지 캐시)"""
+        import numpy as np
+
+        if self._stats is not None:
+            return self._stats
+        if not self._count:
+            return {}
+
+        close0 = self._col(self._close, 0)
+        volume0 = self._col(self._volume, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = {
+                k: (close0 / self._col(self._close, k) - 1) * 100 if self._count > k
+                else np.full(len(self.symbols), np.nan)
+                for k in self.RETURN_WINDOWS
+            }
+            ma = {m: np.where(self._cnt[m] == m, self._sum[m] / self._cnt[m], np.nan) for m in self.MA_WINDOWS}
+            from_high = (close0 / self._high - 1) * 100
+            from_low = (close0 / self._low - 1) * 100
+            volume_ratio = volume0 / (self._vsum / self._vcnt)
+        diff = ma[5] - ma[20]
+        golden = (self._prev_diff <= 0) & (diff > 0)
+        dead = (self._prev_diff >= 0) & (diff < 0)
+
+        def _num(x, digits=2):
+            return None if np.isnan(x) or np.isinf(x) else round(float(x), digits)
+
+        self._stats = {
+            symbol: {
+                "return_5d": _num(returns[5][i]),
+                "return_20d": _num(returns[20][i]),
+                "return_60d": _num(returns[60][i]),
+                "from_52w_high_pct": _num(from_high[i]),
+                "from_52w_low_pct": _num(from_low[i]),
+                "streak": int(self._streak[i]),
+                "volume_vs_20d_avg": _num(volume_ratio[i]),
+                "ma5": _num(ma[5][i]),
+                "ma20": _num(ma[20][i]),
+                "ma60": _num(ma[60][i]),
+                "ma_cross": "golden" if golden[i] else "dead" if dead[i] else None,
+            }
+            for i, symbol in enumerate(self.symbols)
+        }
+        return self._stats
+
+
+_trend_engines: dict[str, RollingStatsEngine] = {}
+_trend_locks: dict[str, threading.Lock] = {}    # 엔진별 갱신/재적재 직렬화 (스레드에서 실행)
+
+
+def _frame_to_matrix(frames: dict, field: str):
+    """{심볼: 일봉 DataFrame} → (날짜 목록, 심볼 × 날짜 행렬)"""
+    import pandas as pd
+
+    table = pd.DataFrame({
+        symbol: df[field] for symbol, df in frames.items() if df is not None and not df.empty
+    })
+    table.index = [pd.Timestamp(d).date() for d in table.index]
+    table = table.groupby(level=0).last().sort_index()
+    return list(table.index), table
+
+
+def _load_engine(symbols: list[str], frames: dict, close_field: str, volume_field: str) -> RollingStatsEngine:
+    engine = RollingStatsEngine(symbols)
+    dates, closes = _frame_to_matrix(frames, close_field)
+    _, volumes = _frame_to_matrix(frames, volume_field)
+    closes = closes.reindex(columns=symbols).ffill()
+    volumes = volumes.reindex(columns=symbols)
+    engine.load(dates, closes.to_numpy().T, volumes.to_numpy().T)
+    return engine
+
+
+def _update_kr_trends(recent_date: str, kospi, kosdaq, frame, wl: Watchlist) -> dict:
+    """KOSPI/KOSDAQ + 관심 종목 추세 지표 (최초 1회 히스토리 적재, 이후 최근 거래일 봉만 추가)"""
+    from pykrx import stock as krx
+
+    symbols = ["KOSPI", "KOSDAQ", *wl.kr_stocks]
+    bar_date = datetime.strptime(recent_date, "%Y%m%d").date()
+    key = f"kr:{wl.name}"
+    with _trend_locks.setdefault(key, threading.Lock()):
+        engine = _trend_engines.get(key)
+
+        # 엔진이 없거나, 마지막 봉 이후 빠진 거래일이 있으면(서버 중단 등) 전체 재적재
+        index_dates = [d.date() for d in kospi.index] if not kospi.empty else []
+        missing = engine is not None and engine.last_date is not None and any(
+            engine.last_date < d < bar_date for d in index_dates
+        )
+        if engine is None or engine.symbols != symbols or missing \
+                or (engine.last_date is not None and index_dates and engine.last_date < index_dates[0]):
+            start = KRX.sessions_back(bar_date, TREND_HISTORY_SESSIONS).strftime("%Y%m%d")
+            frames = {
+                "KOSPI": krx.get_index_ohlcv(start, recent_date, "1001"),
+                "KOSDAQ": krx.get_index_ohlcv(start, recent_date, "2001"),
+            }
+
+            def fetch(ticker_code):
+                try:
+                    return ticker_code, krx.get_market_ohlcv(start, recent_date, ticker_code)
+                except Exception:
+                    return ticker_code, None
+
+            # 종목별 히스토리는 묶음 API가 없으므로 동시 요청으로 분할
+            with ThreadPoolExecutor(max_workers=KRX_FETCH_CONCURRENCY) as pool:
+                frames.update(pool.map(fetch, wl.kr_stocks))
+            engine = _load_engine(symbols, frames, "종가", "거래량")
+            _trend_engines[key] = engine
+        else:
+            closes, volumes = {}, {}
+            for name, df in (("KOSPI", kospi), ("KOSDAQ", kosdaq)):
+                if not df.empty:
+                    closes[name] = float(df.iloc[-1]["종가"])
+                    volumes[name] = float(df.iloc[-1]["거래량"])
+            if frame is not None:
+                for ticker_code in wl.kr_stocks:
+                    row = frame.row(ticker_code)
+                    if row is not None:
+                        closes[ticker_code] = row["close"]
+                        volumes[ticker_code] = row["volume"]
+            engine.update(bar_date, closes, volumes)
+        return engine.stats()
+
+
+def _update_us_trends(histories: dict, wl: Watchlist) -> dict:
+    """미국 지수 + 관심 종목 추세 지표 (최초 1회 일괄 다운로드, 이후 수집된 최근 봉만 추가)"""
+    symbols = [*wl.us_indices, *wl.us_stocks]
+    key = f"us:{wl.name}"
+    with _trend_locks.setdefault(key, threading.Lock()):
+        engine = _trend_engines.get(key)
+        dates, closes = _frame_to_matrix(histories, "Close")
+        _, volumes = _frame_to_matrix(histories, "Volume")
+        if not dates:
+            return engine.stats() if engine is not None else {}
+
+        # 최근 봉 묶음이 엔진 마지막 봉과 이어지지 않으면 전체 재적재
+        if engine is None or engine.symbols != symbols or engine.last_date is None \
+                or engine.last_date < dates[0]:
+            start = NYSE.sessions_back(dates[-1], TREND_HISTORY_SESSIONS).isoformat()
+            frames = yf_download(symbols, start=start)
+            engine = _load_engine(symbols, frames, "Close", "Volume")
+            _trend_engines[key] = engine
+        for d in dates:
+            if d < engine.last_date:
+                continue
+            engine.update(
+                d,
+                {s: v for s, v in closes.loc[d].items() if v == v},
+                {s: v for s, v in volumes.loc[d].items() if v == v},
+            )
+        return engine.stats()
+
+
+def _trend_note(trend: dict | None) -> str:
+    """피드용 추세 요약 한 줄 (5/20일 수익률, 52주 고점 대비, 연속일, 거래량, MA 크로스)"""
+    if not trend:
+        return ""
+    parts = []
+    for key, label in (("return_5d", "5일"), ("return_20d", "20일")):
+        if trend.get(key) is not None:
+            parts.append(f"{label} {trend[key]:+.1f}%")
+    if trend.get("from_52w_high_pct") is not None:
+        parts.append(f"52주고점 {trend['from_52w_high_pct']:+.1f}%")
+    streak = trend.get("streak") or 0
+    if abs(streak) >= 2:
+        parts.append(f"{abs(streak)}일 연속 {'상승' if streak > 0 else '하락'}")
+    if trend.get("volume_vs_20d_avg") is not None and trend["volume_vs_20d_avg"] >= 1.5:
+        parts.append(f"거래량 20일평균 {trend['volume_vs_20d_avg']:.1f}배")
+    if trend.get("ma_cross"):
+        parts.append("골든크로스" if trend["ma_cross"] == "golden" else "데드크로스")
+    return f" [{' · '.join(parts)}]" if parts else ""
+
+
+# ============================================================
+# 2-3. 미국 종목 레지스트리 (NASDAQ Trader 심볼 디렉터리 로컬 캐시 — 이름 조회/티커 검증)
+# ============================================================
+US_SYMBOLS_PATH = os.environ.get("US_SYMBOLS_PATH", "us_symbols.json")
+US_SYMBOLS_MAX_AGE = 86400          # 초, 이보다 오래되면 백그라운드 갱신
+US_SYMBOLS_RETRY_SECONDS = 600      # 적재 실패 후 재시도 간격
+US_SYMBOLS_MIN_COUNT = 1000         # 이보다 적으면 비정상 응답으로 간주
+US_SYMBOL_SOURCES = {
+    "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt": "nasdaq",
+    "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt": "other",
+}
+_US_NAME_SUFFIX = re.compile(r"\s+(Common Stock|Common Shares|Ordinary Shares)$")
+US_EXCHANGE_NAMES = {"Q": "NASDAQ", "N": "NYSE", "A": "NYSE American", "P": "NYSE Arca", "Z": "Cboe BZX", "V": "IEX"}
+
+
+def _parse_symbol_directory(text: str, kind: str) -> dict[str, list]:
+    """심볼 디렉터리(| 구분) → {yfinance 심볼: [이름, 거래소, ETF 여부]} (테스트 종목 제외)"""
+    lines = text.strip().splitlines()
+    header = lines[0].split("|")
+    col = {name: i for i, name in enumerate(header)}
+    symbols = {}
+    for line in lines[1:]:
+        row = line.split("|")
+        if len(row) != len(header) or line.startswith("File Creation Time") or row[col["Test Issue"]] == "Y":
+            continue
+        if kind == "nasdaq":
+            symbol, exchange = row[col["Symbol"]], "NASDAQ"
+        else:
+            symbol, exchange = row[col["ACT Symbol"]], US_EXCHANGE_NAMES.get(row[col["Exchange"]], row[col["Exchange"]])
+        name = _US_NAME_SUFFIX.sub("", row[col["Security Name"]].split(" - ")[0].strip())
+        symbols[UsSymbolRegistry.normalize(symbol)] = [name, exchange, row[col["ETF"]] == "Y"]
+    return symbols
+
+
+class UsSymbolRegistry:
+    """상장 미국 종목 메타데이터 (JSON 파일 영속, 만료 시 지연 갱신)"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._symbols: dict[str, list] = {}
+        self._fetched_at = 0.0
+        self._next_attempt = 0.0
+        self._lock = asyncio.Lock()
+        self._refreshing: asyncio.Task | None = None
+        try:
+            with open(path, "rb") as f:
+                saved = orjson.loads(f.read())
+            self._symbols, self._fetched_at = saved["symbols"], saved["fetched_at"]
+        except Exception:
+            pass
+
+    @staticmethod
+    def normalize(symbol: str) -> str:
+        """BRK.B / BRK/B → BRK-B (yfinance 표기)"""
+        return symbol.strip().upper().replace(".", "-").replace("/", "-")
+
+    @staticmethod
+    def _download() -> dict[str, list]:
+        import urllib.request
+
+        symbols = {}
+        for url, kind in US_SYMBOL_SOURCES.items():
+            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+            with urllib.request.urlopen(req, timeout=20) as resp:
+                symbols.update(_parse_symbol_directory(resp.read().decode("utf-8", "replace"), kind))
+        if len(symbols) < US_SYMBOLS_MIN_COUNT:
+            raise ValueError(f"심볼 디렉터리 응답 이상: {len(symbols)}개")
+        return symbols
+
+    async def _refresh(self):
+        if time.monotonic() < self._next_attempt:
+            return
+        try:
+            symbols = await run_on_host("www.nasdaqtrader.com", breaker("nasdaq-trader:symdir").call, self._download)
+        except Exception:
+            self._next_attempt = time.monotonic() + US_SYMBOLS_RETRY_SECONDS
+            return
+        self._symbols, self._fetched_at = symbols, time.time()
+        tmp = f"{self._path}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps({"fetched_at": self._fetched_at, "symbols": symbols}))
+            os.replace(tmp, self._path)
+        except OSError:
+            pass
+
+    async def ensure_loaded(self) -> bool:
+        """비어 있으면 즉시 적재, 오래됐으면 기존 목록으로 응답하며 백그라운드 갱신. 사용 가능 여부 반환"""
+        if not self._symbols:
+            async with self._lock:
+                if not self._symbols:
+                    await self._refresh()
+        elif time.time() - self._fetched_at > US_SYMBOLS_MAX_AGE \
+                and (self._refreshing is None or self._refreshing.done()):
+            self._refreshing = asyncio.create_task(self._refresh())
+        return bool(self._symbols)
+
+    def get(self, symbol: str) -> dict | None:
+        meta = self._symbols.get(self.normalize(symbol))
+        if meta is None:
+            return None
+        return {"symbol": self.normalize(symbol), "name": meta[0], "exchange": meta[1], "etf": meta[2]}
+
+    def name(self, symbol: str) -> str:
+        meta = self._symbols.get(self.normalize(symbol))
+        return meta[0] if meta else symbol
+
+    async def validate(self, symbols: list[str]) -> list[str]:
+        """상장 종목만 남김 (정규화·중복 제거, 순서 유지). 레지스트리를 못 불러오면 검증 없이 통과"""
+        normalized = list(dict.fromkeys(self.normalize(s) for s in symbols if s and s.strip()))
+        if not await self.ensure_loaded():
+            return normalized
+        return [s for s in normalized if s in self._symbols]
+
+
+us_symbols = UsSymbolRegistry(US_SYMBOLS_PATH)
+
+
+@app.get("/api/us-symbols/{symbol}")
+async def api_us_symbol(symbol: str):
+    """미국 종목 메타데이터 (이름/거래소/ETF 여부)"""
+    if not await us_symbols.ensure_loaded():
+        raise HTTPException(status_code=503, detail="종목 레지스트리를 불러오지 못했습니다")
+    meta = us_symbols.get(symbol)
+    if meta is None:
+        raise HTTPException(status_code=404, detail=f"상장 종목 아님: {symbol}")
+    return meta
+
+
 # ============================================================
 # 3. 캔들스틱 차트 생성 (mplfinance)
 # ============================================================
@@ -285,52 +1785,62 @@ class ChartRequest(BaseModel):
     ma: list[int] = [5, 20, 60]
 
 
-@app.post("/api/chart")
-async def generate_chart(req: ChartRequest):
-    """캔들스틱 차트 이미지 생성 (PNG)"""
-    try:
-        import pandas as pd
-        import mplfinance as mpf
-        import matplotlib
-        matplotlib.use("Agg")
-
-        if req.market == "kr":
-            from pykrx import stock as krx
-            today = datetime.now().strftime("%Y%m%d")
-            start = (datetime.now() - timedelta(days=req.days + 15)).strftime("%Y%m%d")
-            df = krx.get_market_ohlcv(start, today, req.symbol)
-            df.index.name = "Date"
-            df = df.rename(columns={
-                "시가": "Open", "고가": "High", "저가": "Low",
-                "종가": "Close", "거래량": "Volume"
-            })
-        else:
-            import yfinance as yf
-            ticker = yf.Ticker(req.symbol)
-            df = ticker.history(period=f"{req.days}d")
+_chart_lock = threading.Lock()  # matplotlib 전역 상태 보호 (스레드에서 렌더링)
 
-        df = df[["Open", "High", "Low", "Close", "Volume"]]
-        df = df.tail(req.days)
 
-        if df.empty:
+def render_chart_png(req: ChartRequest) -> bytes:
+    """캔들스틱 차트 PNG 바이트 (블로킹 — 스레드에서 호출)"""
+    import mplfinance as mpf
+    import matplotlib
+    matplotlib.use("Agg")
+
+    if req.market == "kr":
+        from pykrx import stock as krx
+        last = KRX.last_session()
+        start = KRX.sessions_back(last, req.days).strftime("%Y%m%d")
+        df = krx.get_market_ohlcv(start, last.strftime("%Y%m%d"), req.symbol)
+        df.index.name = "Date"
+        df = df.rename(columns={
+            "시가": "Open", "고가": "High", "저가": "Low",
+            "종가": "Close", "거래량": "Volume"
+        })
+    else:
+        last = NYSE.last_session()
+        try:
+            df = yf_history(req.symbol, start=NYSE.sessions_back(last, req.days).isoformat(),
+                            end=(last + timedelta(days=1)).isoformat())
+        except UpstreamEmptyError:
             raise HTTPException(status_code=404, detail="데이터 없음")
 
-        mc = mpf.make_marketcolors(
-            up="red", down="blue", edge="inherit",
-            wick="inherit", volume="in",
-        )
-        style = mpf.make_mpf_style(marketcolors=mc, gridstyle="-", gridcolor="#e0e0e0")
+    df = df[["Open", "High", "Low", "Close", "Volume"]]
+    df = df.tail(req.days)
+
+    if df.empty:
+        raise HTTPException(status_code=404, detail="데이터 없음")
 
-        buf = io.BytesIO()
+    mc = mpf.make_marketcolors(
+        up="red", down="blue", edge="inherit",
+        wick="inherit", volume="in",
+    )
+    style = mpf.make_mpf_style(marketcolors=mc, gridstyle="-", gridcolor="#e0e0e0")
+
+    buf = io.BytesIO()
+    with _chart_lock:
         mpf.plot(
             df, type="candle", style=style,
             volume=True, mav=tuple(req.ma),
             title=f"{req.symbol} ({req.market.upper()})",
             savefig=dict(fname=buf, dpi=150, bbox_inches="tight"),
         )
-        buf.seek(0)
+    return buf.getvalue()
+
 
-        return StreamingResponse(buf, media_type="image/png")
+@app.post("/api/chart")
+async def generate_chart(req: ChartRequest):
+    """캔들스틱 차트 이미지 생성 (PNG)"""
+    try:
+        png = await asyncio.get_running_loop().run_in_executor(_upstream_executor, render_chart_png, req)
+        return Response(content=png, media_type="image/png")
     except HTTPException:
         raise
     except Exception as e:
@@ -340,27 +1850,20 @@ async def generate_chart(req: ChartRequest):
 # ============================================================
 # 4. 환율 및 원자재 데이터
 # ============================================================
-@app.get("/api/forex")
-async def get_forex_data():
+async def get_forex_data(watchlist: Watchlist | None = None):
     """원/달러 환율 및 주요 원자재 가격"""
     try:
-        import yfinance as yf
-
-        symbols = {
-            "KRW=X": "USD/KRW",
-            "GC=F": "Gold",
-            "CL=F": "WTI_Oil",
-            "BTC-USD": "Bitcoin",
-            "^VIX": "VIX_공포지수",
-            "^TNX": "미국10년국채금리",
-        }
+        wl = watchlist or watchlists.get()
+        try:
+            histories = await run_on_host(YAHOO_HOST, yf_download, list(wl.forex), period="5d")
+        except Exception:
+            histories = {}
 
         result = {}
-        for symbol, name in symbols.items():
+        for symbol, name in wl.forex.items():
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="5d")
-                if not hist.empty and len(hist) > 1:
+                hist = histories.get(symbol)
+                if hist is not None and not hist.empty and len(hist) > 1:
                     latest = hist.iloc[-1]
                     prev = hist.iloc[-2]
                     result[name] = {
@@ -375,101 +1878,232 @@ async def get_forex_data():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/forex")
+async def api_forex(request: Request, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    return await cached_response(request, wl.cache_key("forex"), lambda: get_forex_data(wl))
+
+
 # ============================================================
-# 5. 뉴스 헤드라인 수집 (고정 키워드 기반)
+# 5-0. 유사 헤드라인 클러스터링 (문자 n-gram MinHash + LSH)
 # ============================================================
-NEWS_KEYWORDS = [
-    "금리", "인플레이션", "반도체", "실적발표", "외국인 매수",
-    "AI 인공지능", "환율", "유가", "연준 Fed", "코스피",
-    "나스닥", "삼성전자", "SK하이닉스", "테슬라", "엔비디아",
-]
+DEDUP_NGRAM = 2             # 한국어는 어절보다 문자 2-gram이 표현 차이에 강함
+DEDUP_THRESHOLD = 0.5       # 추정 자카드 유사도 이상이면 같은 기사로 묶음
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 16          # 16밴드 × 2행 → 자카드 0.5에서 후보 검출 확률 ≈ 99%
+
+_TITLE_SOURCE_SUFFIX = re.compile(r"\s+[-|]\s+[^-|]{1,30}$")   # "제목 - 매체명"
+_TITLE_TAG = re.compile(r"[\[【<(][^\]】>)]{0,10}[\]】>)]")       # [속보], (종합) 등
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@functools.lru_cache(maxsize=1)
+def _minhash_params():
+    import numpy as np
+    rng = np.random.default_rng(0x5EED)
+    a = rng.integers(1, 2**63, MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)  # 홀수 → 2^64 위 전단사
+    b = rng.integers(0, 2**63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def _normalize_title(text: str) -> str:
+    text = _TITLE_SOURCE_SUFFIX.sub("", text)
+    text = _TITLE_TAG.sub("", text)
+    return _NON_WORD.sub("", text).lower()
+
+
+def _minhash_signature(text: str):
+    import numpy as np
+
+    norm = _normalize_title(text) or text
+    grams = {norm[i:i + DEDUP_NGRAM] for i in range(max(1, len(norm) - DEDUP_NGRAM + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams),
+        dtype=np.uint64, count=len(grams),
+    )
+    a, b = _minhash_params()
+    return (a * hashes[None, :] + b).min(axis=1)
+
+
+def cluster_near_duplicates(items: list[dict], text_key: str, source_of=None) -> list[dict]:
+    """유사 제목을 한 클러스터로 묶고 대표 항목(첫 등장)만 남김 — 항목 수에 선형.
+
+    대표 항목에 source_count(묶인 기사 수)와 sources(출처 목록)를 추가한다."""
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    buckets = [{} for _ in range(MINHASH_BANDS)]
+    reps, signatures, sources = [], [], []
+
+    for item in items:
+        text = item.get(text_key) or ""
+        source = source_of(item) if source_of else None
+        if not text.strip():
+            # 빈 제목끼리는 서명이 같아 모두 한 클러스터가 되므로 묶지 않고 그대로 통과
+            reps.append(dict(item))
+            signatures.append(None)
+            sources.append([source] if source else [])
+            continue
+        sig = _minhash_signature(text)
+        band_keys = [sig[b * rows:(b + 1) * rows].tobytes() for b in range(MINHASH_BANDS)]
+
+        match = None
+        for b, key in enumerate(band_keys):
+            for idx in buckets[b].get(key, ()):
+                if (signatures[idx] == sig).mean() >= DEDUP_THRESHOLD:
+                    match = idx
+                    break
+            if match is not None:
+                break
+
+        if match is None:
+            idx = len(reps)
+            reps.append(dict(item))
+            signatures.append(sig)
+            sources.append([source] if source else [])
+            for b, key in enumerate(band_keys):
+                buckets[b].setdefault(key, []).append(idx)
+        else:
+            reps[match]["source_count"] = reps[match].get("source_count", 1) + 1
+            if source and source not in sources[match]:
+                sources[match].append(source)
 
+    for rep, srcs in zip(reps, sources):
+        rep.setdefault("source_count", 1)
+        rep["sources"] = srcs
+    return reps
 
-@app.get("/api/news")
-async def get_news_headlines():
-    """고정 키워드 기반 뉴스 헤드라인 수집 (RSS/웹 크롤링)"""
-    import urllib.request
+
+def _url_domain(item: dict) -> str:
+    from urllib.parse import urlparse
+    return urlparse(item.get("url", "")).netloc.removeprefix("www.")
+
+
+# ============================================================
+# 5. 뉴스 헤드라인 수집 (관심 목록 키워드 기반)
+# ============================================================
+GOOGLE_NEWS_LOCALES = {
+    "ko": "hl=ko&gl=KR&ceid=KR:ko",
+    "en": "hl=en&gl=US&ceid=US:en",
+}
+
+
+def fetch_google_news(query: str, lang: str = "ko", window: str = "1d", limit: int = 3) -> list[dict]:
+    """Google News RSS 검색 결과 상위 limit건 (headline/source/date, google-news:rss 브레이커)"""
+    return breaker("google-news:rss").call(
+        _fetch_google_news, query, lang, window, limit, cache_key=(query, lang, window, limit),
+    )
+
+
+RSS_READ_CHUNK = 16 * 1024     # 응답 스트림에서 한 번에 읽는 바이트
+
+
+def iter_rss_items(stream, limit: int):
+    """RSS 스트림 증분 파싱 — item의 title/source/pubDate만 뽑고 limit건이면 읽기 중단"""
     import xml.etree.ElementTree as ET
+
+    if limit <= 0:
+        return
+    parser = ET.XMLPullParser(events=("start", "end"))
+    channel = None
+    count = 0
+    while chunk := stream.read(RSS_READ_CHUNK):
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if elem.tag == "channel":
+                    channel = elem
+                continue
+            if elem.tag != "item":
+                continue
+            title = elem.findtext("title")
+            if title and title.strip():
+                yield {
+                    "headline": title.strip(),
+                    "source": (elem.findtext("source") or "").strip(),
+                    "date": (elem.findtext("pubDate") or "").strip(),
+                }
+                count += 1
+            # 처리한 item은 바로 버려 트리가 커지지 않게
+            elem.clear()
+            if channel is not None:
+                channel.remove(elem)
+            if count >= limit:
+                return
+    parser.close()
+
+
+def _fetch_google_news(query: str, lang: str, window: str, limit: int) -> list[dict]:
+    import urllib.request
     from urllib.parse import quote
 
+    url = f"https://news.google.com/rss/search?q={quote(query)}+when:{window}&{GOOGLE_NEWS_LOCALES[lang]}"
+    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    # limit건을 채우면 나머지 본문은 읽지 않고 연결을 닫음
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return list(iter_rss_items(resp, limit))
+
+
+async def get_news_headlines(watchlist: Watchlist | None = None):
+    """관심 목록 키워드 기반 뉴스 헤드라인 수집 (키워드별 RSS 동시 요청)"""
+    wl = watchlist or watchlists.get()
+    fetched = await asyncio.gather(
+        *(run_on_host("news.google.com", fetch_google_news, keyword, "ko", "1d", limit=3)  # 키워드당 최대 3개
+          for keyword in wl.news_keywords),
+        return_exceptions=True,
+    )
     all_news = []
-
-    for keyword in NEWS_KEYWORDS:
-        try:
-            encoded = quote(keyword)
-            url = f"https://news.google.com/rss/search?q={encoded}+when:1d&hl=ko&gl=KR&ceid=KR:ko"
-            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                xml_data = resp.read()
-
-            root = ET.fromstring(xml_data)
-            items = root.findall(".//item")
-
-            for item in items[:3]:  # 키워드당 최대 3개
-                title = item.find("title")
-                pub_date = item.find("pubDate")
-                source = item.find("source")
-
-                if title is not None and title.text:
-                    all_news.append({
-                        "keyword": keyword,
-                        "headline": title.text.strip(),
-                        "source": source.text.strip() if source is not None and source.text else "",
-                        "date": pub_date.text.strip() if pub_date is not None and pub_date.text else "",
-                    })
-        except Exception:
+    for keyword, items in zip(wl.news_keywords, fetched):
+        if isinstance(items, Exception):
             continue
+        all_news.extend({"keyword": keyword, **item} for item in items)
 
-    # 중복 헤드라인 제거
-    seen = set()
-    unique_news = []
-    for item in all_news:
-        if item["headline"] not in seen:
-            seen.add(item["headline"])
-            unique_news.append(item)
+    # 중복/유사 헤드라인 제거 (다른 매체의 같은 기사는 대표 1건 + 출처 수)
+    unique_news = cluster_near_duplicates(all_news, "headline", lambda item: item["source"])
 
     return {
-        "keywords_used": NEWS_KEYWORDS,
+        "keywords_used": list(wl.news_keywords),
         "total_headlines": len(unique_news),
         "headlines": unique_news,
     }
 
 
+@app.get("/api/news")
+async def api_news(request: Request, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    return await cached_response(request, wl.cache_key("news"), lambda: get_news_headlines(wl))
+
+
 # ============================================================
 # 5-2. Tavily 심층 뉴스 검색
 # ============================================================
-TAVILY_KEYWORDS = [
-    "한국 증시 코스피 오늘",
-    "미국 증시 나스닥 S&P500",
-    "반도체 AI 엔비디아 SK하이닉스",
-    "환율 원달러 금리 연준",
-    "삼성전자 테슬라 실적",
-]
-
-
-@app.get("/api/tavily-news")
-async def get_tavily_news():
-    """Tavily Search API로 심층 뉴스 수집 (본문 요약 포함)"""
+async def get_tavily_news(watchlist: Watchlist | None = None):
+    """Tavily Search API로 심층 뉴스 수집 (본문 요약 포함, 키워드별 동시 요청)"""
     if not TAVILY_API_KEY:
         return {"error": "TAVILY_API_KEY not set", "results": []}
 
     try:
         from tavily import TavilyClient
 
+        wl = watchlist or watchlists.get()
         client = TavilyClient(api_key=TAVILY_API_KEY)
+        responses = await asyncio.gather(
+            *(run_on_host(
+                "api.tavily.com", tavily_search, client,
+                query=keyword,
+                search_depth="basic",
+                topic="news",
+                days=1,
+                max_results=5,
+                include_answer=False,
+            ) for keyword in wl.tavily_keywords),
+            return_exceptions=True,
+        )
         all_results = []
         seen_urls = set()
 
-        for keyword in TAVILY_KEYWORDS:
+        for keyword, response in zip(wl.tavily_keywords, responses):
+            if isinstance(response, Exception):
+                continue
             try:
-                response = client.search(
-                    query=keyword,
-                    search_depth="basic",
-                    topic="news",
-                    days=1,
-                    max_results=5,
-                    include_answer=False,
-                )
                 for r in response.get("results", []):
                     if r["url"] not in seen_urls:
                         seen_urls.add(r["url"])
@@ -482,8 +2116,10 @@ async def get_tavily_news():
             except Exception:
                 continue
 
+        all_results = cluster_near_duplicates(all_results, "title", _url_domain)
+
         return {
-            "keywords_used": TAVILY_KEYWORDS,
+            "keywords_used": list(wl.tavily_keywords),
             "total_results": len(all_results),
             "results": all_results,
         }
@@ -491,46 +2127,71 @@ async def get_tavily_news():
         return {"error": str(e), "results": []}
 
 
+@app.get("/api/tavily-news")
+async def api_tavily_news(request: Request, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    return await cached_response(request, wl.cache_key("tavily-news"), lambda: get_tavily_news(wl))
+
+
 # ============================================================
 # 5-3. Seeking Alpha 데이터 (RapidAPI)
-# ============================================================
-SA_SYMBOLS = ["NVDA", "AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "META", "AMD", "AVGO"]
-
+# ============================================================
 RAPIDAPI_HEADERS = {
     "x-rapidapi-host": "seeking-alpha.p.rapidapi.com",
 }
 
 
-def _sa_get(endpoint: str, params: dict = None) -> dict | None:
-    """Seeking Alpha API 호출 헬퍼"""
-    if not RAPIDAPI_KEY:
-        return None
+def _sa_request(endpoint: str, params: dict) -> dict | None:
     import requests
     headers = {**RAPIDAPI_HEADERS, "x-rapidapi-key": RAPIDAPI_KEY}
+    resp = requests.get(
+        f"https://seeking-alpha.p.rapidapi.com{endpoint}",
+        headers=headers,
+        params=params,
+        timeout=15,
+    )
+    # 레이트리밋/서버 오류만 공급자 장애로 집계 (404 등은 정상 응답 취급)
+    if resp.status_code == 429 or resp.status_code >= 500:
+        raise RuntimeError(f"HTTP {resp.status_code}")
+    if resp.status_code == 200:
+        return resp.json()
+    return None
+
+
+def _sa_fetch(endpoint: str, params: dict = None) -> dict | None:
+    """Seeking Alpha API 호출 (엔드포인트별 브레이커, 실패는 예외로 전달)"""
+    if not RAPIDAPI_KEY:
+        return None
+    params = params or {}
+    return breaker(f"seeking-alpha:{endpoint}").call(
+        _sa_request, endpoint, params, cache_key=tuple(sorted(params.items())),
+    )
+
+
+def _sa_get(endpoint: str, params: dict = None) -> dict | None:
+    """Seeking Alpha API 호출 헬퍼 (실패 시 None)"""
     try:
-        resp = requests.get(
-            f"https://seeking-alpha.p.rapidapi.com{endpoint}",
-            headers=headers,
-            params=params or {},
-            timeout=15,
-        )
-        if resp.status_code == 200:
-            return resp.json()
+        return _sa_fetch(endpoint, params)
     except Exception:
-        pass
-    return None
+        return None
 
 
-@app.get("/api/seeking-alpha")
-async def get_seeking_alpha_data():
+async def get_seeking_alpha_data(watchlist: Watchlist | None = None):
     """Seeking Alpha: 애널리스트 레이팅 + 실적 캘린더 + 인기 분석"""
     if not RAPIDAPI_KEY:
         return {"error": "RAPIDAPI_KEY not set", "ratings": [], "trending": []}
 
-    # 1) 주요 종목 애널리스트 레이팅
+    wl = watchlist or watchlists.get()
+    host = RAPIDAPI_HEADERS["x-rapidapi-host"]
+    # 레이팅(종목별)과 트렌딩 뉴스를 호스트 동시성 한도 내에서 한꺼번에 요청
+    *rating_data, trending_data = await asyncio.gather(
+        *(run_on_host(host, _sa_get, "/symbols/get-ratings", {"symbol": symbol}) for symbol in wl.sa_symbols),
+        run_on_host(host, _sa_get, "/news/v2/list", {"category": "market-news::all", "size": 10}),
+    )
+
+    # 1) 관심 종목 애널리스트 레이팅
     ratings = []
-    for symbol in SA_SYMBOLS:
-        data = _sa_get("/symbols/get-ratings", {"symbol": symbol})
+    for symbol, data in zip(wl.sa_symbols, rating_data):
         if data and "data" in data and isinstance(data["data"], list) and len(data["data"]) > 0:
             try:
                 r = data["data"][0].get("attributes", {}).get("ratings", {})
@@ -545,7 +2206,7 @@ async def get_seeking_alpha_data():
 
     # 2) 트렌딩 마켓 뉴스
     trending = []
-    data = _sa_get("/news/v2/list", {"category": "market-news::all", "size": 10})
+    data = trending_data
     if data and "data" in data:
         for article in data["data"][:10]:
             try:
@@ -563,17 +2224,25 @@ async def get_seeking_alpha_data():
     }
 
 
+@app.get("/api/seeking-alpha")
+async def api_seeking_alpha(request: Request, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    return await cached_response(request, wl.cache_key("seeking-alpha"), lambda: get_seeking_alpha_data(wl))
+
+
 # ============================================================
 # 6-0. 헤드라인 기반 동적 기업 추출 헬퍼 함수들
 # ============================================================
-async def extract_companies_from_headlines(headlines: list) -> dict:
-    """Claude Haiku로 헤드라인에서 고정 목록에 없는 신규 기업 추출"""
+async def extract_companies_from_headlines(headlines: list, watchlist: Watchlist | None = None) -> dict:
+    """Claude Haiku로 헤드라인에서 관심 목록에 없는 신규 기업 추출"""
     if not ANTHROPIC_API_KEY or not headlines:
         return {"us_tickers": [], "kr_companies": []}
 
+    wl = watchlist or watchlists.get()
+    fixed_us_set, fixed_kr_set = set(wl.us_stocks), set(wl.kr_stocks.values())
     headline_text = "\n".join([f"- {item['headline']}" for item in headlines[:60]])
-    fixed_us = ", ".join(sorted(US_FIXED_TICKERS))
-    fixed_kr = ", ".join(sorted(KR_FIXED_NAMES))
+    fixed_us = ", ".join(sorted(fixed_us_set))
+    fixed_kr = ", ".join(sorted(fixed_kr_set))
 
     prompt = f"""다음 뉴스 헤드라인에서 언급된 기업들을 추출해줘.
 
@@ -598,7 +2267,8 @@ async def extract_companies_from_headlines(headlines: list) -> dict:
     try:
         import anthropic
         client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        response = client.messages.create(
+        response = await run_on_host(
+            "api.anthropic.com", client.messages.create,
             model="claude-haiku-4-5-20251001",
             max_tokens=400,
             messages=[{"role": "user", "content": prompt}],
@@ -611,33 +2281,34 @@ async def extract_companies_from_headlines(headlines: list) -> dict:
             if text.startswith("json"):
                 text = text[4:]
         result = json.loads(text)
+        us_tickers = await us_symbols.validate(result.get("us_tickers", []))
         return {
-            "us_tickers": [t for t in result.get("us_tickers", []) if t not in US_FIXED_TICKERS],
-            "kr_companies": [c for c in result.get("kr_companies", []) if c not in KR_FIXED_NAMES],
+            "us_tickers": [t for t in us_tickers if t not in fixed_us_set],
+            "kr_companies": [c for c in result.get("kr_companies", []) if c not in fixed_kr_set],
         }
     except Exception:
         return {"us_tickers": [], "kr_companies": []}
 
 
 async def fetch_extra_us_stocks(tickers: list) -> dict:
-    """헤드라인 추출 추가 미국 종목 주가 수집 (최대 5개)"""
-    if not tickers:
+    """헤드라인 추출 추가 미국 종목 주가 수집 (최대 5개, 상장 종목만 1회 일괄 조회)"""
+    symbols = (await us_symbols.validate(tickers))[:5]
+    if not symbols:
         return {}
-    import yfinance as yf
+    last = NYSE.last_session()
+    histories = await run_on_host(
+        YAHOO_HOST, yf_download, symbols,
+        start=NYSE.sessions_back(last, 3).isoformat(), end=(last + timedelta(days=1)).isoformat(),
+    )
 
     stocks = {}
-    for symbol in tickers[:5]:
+    for symbol in symbols:
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="5d")
-            if not hist.empty and len(hist) > 1:
+            hist = histories.get(symbol)
+            if hist is not None and not hist.empty and len(hist) > 1:
                 latest = hist.iloc[-1]
                 prev = hist.iloc[-2]
-                try:
-                    name = ticker.fast_info.company_name or symbol
-                except Exception:
-                    name = symbol
-                stocks[name] = {
+                stocks[us_symbols.name(symbol)] = {
                     "symbol": symbol,
                     "close": round(float(latest["Close"]), 2),
                     "prev_close": round(float(prev["Close"]), 2),
@@ -655,16 +2326,21 @@ async def fetch_extra_kr_stocks(company_names: list) -> dict:
         return {}
     from pykrx import stock as krx
 
-    end = datetime.now().strftime("%Y%m%d")
-    start = (datetime.now() - timedelta(days=15)).strftime("%Y%m%d")
+    last = KRX.last_session()
+    end = last.strftime("%Y%m%d")
+    start = KRX.sessions_back(last, 2).strftime("%Y%m%d")
+
+    targets = [(name, KR_NAME_TO_TICKER[name]) for name in company_names[:5] if name in KR_NAME_TO_TICKER]
+    frames = await asyncio.gather(
+        *(run_on_host(KRX_HOST, krx.get_market_ohlcv, start, end, ticker_code) for _, ticker_code in targets),
+        return_exceptions=True,
+    )
 
     stocks = {}
-    for name in company_names[:5]:
-        ticker_code = KR_NAME_TO_TICKER.get(name)
-        if not ticker_code:
+    for (name, ticker_code), df in zip(targets, frames):
+        if isinstance(df, Exception):
             continue
         try:
-            df = krx.get_market_ohlcv(start, end, ticker_code)
             if df is not None and not df.empty and len(df) >= 1:
                 row = df.iloc[-1]
                 prev_row = df.iloc[-2] if len(df) > 1 else row
@@ -684,361 +2360,1794 @@ async def fetch_extra_kr_stocks(company_names: list) -> dict:
 
 
 async def fetch_extra_tavily(names: list) -> list:
-    """헤드라인 추출 기업들의 Tavily 뉴스 추가 수집 (최대 3개 기업)"""
+    """헤드라인 추출 기업들의 Tavily 뉴스 추가 수집 (최대 3개 기업, 동시 요청)"""
     if not names or not TAVILY_API_KEY:
         return []
     try:
         from tavily import TavilyClient
         client = TavilyClient(api_key=TAVILY_API_KEY)
+        responses = await asyncio.gather(
+            *(run_on_host(
+                "api.tavily.com", tavily_search, client,
+                query=f"{name} 주가 뉴스 최신",
+                search_depth="basic",
+                topic="news",
+                days=2,
+                max_results=3,
+                include_answer=False,
+            ) for name in names[:3]),
+            return_exceptions=True,
+        )
         results = []
-        for name in names[:3]:
-            try:
-                response = client.search(
-                    query=f"{name} 주가 뉴스 최신",
-                    search_depth="basic",
-                    topic="news",
-                    days=2,
-                    max_results=3,
-                    include_answer=False,
-                )
-                for r in response.get("results", []):
-                    results.append({
-                        "keyword": f"[추출기업] {name}",
-                        "title": r.get("title", ""),
-                        "content": r.get("content", ""),
-                        "url": r.get("url", ""),
-                    })
-            except Exception:
+        for name, response in zip(names[:3], responses):
+            if isinstance(response, Exception):
                 continue
+            for r in response.get("results", []):
+                results.append({
+                    "keyword": f"[추출기업] {name}",
+                    "title": r.get("title", ""),
+                    "content": r.get("content", ""),
+                    "url": r.get("url", ""),
+                })
         return results
     except Exception:
         return []
 
 
 async def fetch_extra_sa_ratings(tickers: list) -> list:
-    """헤드라인 추출 미국 종목 Seeking Alpha 레이팅 (최대 3개)"""
+    """헤드라인 추출 미국 종목 Seeking Alpha 레이팅 (최대 3개, 동시 요청)"""
     if not tickers or not RAPIDAPI_KEY:
         return []
-    ratings = []
-    for symbol in tickers[:3]:
-        data = _sa_get("/symbols/get-ratings", {"symbol": symbol})
-        if data and "data" in data and isinstance(data["data"], list) and len(data["data"]) > 0:
-            try:
-                r = data["data"][0].get("attributes", {}).get("ratings", {})
-                ratings.append({
-                    "symbol": symbol,
-                    "wall_street": round(r.get("sellSideRating", 0), 2) if r.get("sellSideRating") else "",
-                    "quant": round(r.get("quantRating", 0), 2) if r.get("quantRating") else "",
-                    "authors": round(r.get("authorsRating", 0), 2) if r.get("authorsRating") else "",
-                })
-            except Exception:
-                continue
-    return ratings
+    host = RAPIDAPI_HEADERS["x-rapidapi-host"]
+    ratings = await asyncio.gather(
+        *(run_on_host(host, _sa_rating, symbol) for symbol in tickers[:3]),
+        return_exceptions=True,
+    )
+    return [r for r in ratings if isinstance(r, dict)]
 
 
 # ============================================================
 # 6. 일일 피드 생성 (Markdown 텍스트 - 복사해서 LLM에 붙여넣기용)
 # ============================================================
-@app.get("/api/daily-feed", response_class=PlainTextResponse)
-async def get_daily_feed():
-    """모든 데이터를 수집하여 LLM 입력용 Markdown 텍스트로 병합"""
-    import asyncio
+@dataclass(slots=True)
+class MarketSnapshot:
+    """세션 1회 수집 결과 — 피드/브리핑 등 모든 출력 형식의 단일 원본"""
+    generated_at: datetime
+    kr: dict
+    us: dict
+    forex: dict
+    watchlist: str = DEFAULT_WATCHLIST
+    enriched: bool = False                      # 뉴스/추가 기업 보강 여부
+    news: dict = field(default_factory=dict)
+    extra_names: list = field(default_factory=list)
+    extra_us_stocks: dict = field(default_factory=dict)
+    extra_kr_stocks: dict = field(default_factory=dict)
+    tavily: list = field(default_factory=list)
+    ratings: list = field(default_factory=list)
+    trending: list = field(default_factory=list)
+
+
+FEED_BUDGET_RESERVE = 80  # 생략 보고 줄에 남겨둘 토큰 (초과하면 보고 줄 크기만큼 늘려 다시 배치)
+
+_HANGUL_OR_CJK = re.compile(r"[ᄀ-ᇿ㄰-㆏가-힣一-鿿]")
+_ASCII_WORD = re.compile(r"[A-Za-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """로컬 토큰 수 추정 (한글/한자 1자 ≈ 1토큰, 영숫자 4자 ≈ 1토큰, 기호 1자 ≈ 1토큰)"""
+    cjk = len(_HANGUL_OR_CJK.findall(text))
+    words = _ASCII_WORD.findall(text)
+    alnum = sum((len(w) + 3) // 4 for w in words)
+    symbols = len(text) - cjk - sum(len(w) for w in words) - text.count(" ") - text.count("\n")
+    return cjk + alnum + max(symbols, 0)
+
+
+class FeedSection:
+    """피드 Markdown 한 섹션: 우선순위 + 항목별 (전체, 축약) 줄 묶음"""
+    __slots__ = ("name", "priority", "header", "items", "footer", "kept", "shortened")
+
+    def __init__(self, name: str, priority: int, header: list[str] | None = None,
+                 footer: list[str] | None = None):
+        self.name = name
+        self.priority = priority
+        self.header = header or []
+        self.items: list[tuple[list[str], list[str] | None]] = []
+        self.footer = footer if footer is not None else [""]
+        self.kept: list[list[str]] = []
+        self.shortened = 0
+
+    def add(self, lines: list[str] | str, compact: list[str] | str | None = None):
+        full = [lines] if isinstance(lines, str) else lines
+        short = [compact] if isinstance(compact, str) else compact
+        self.items.append((full, short))
+
+    def lines(self) -> list[str]:
+        return [*self.header, *(line for item in self.kept for line in item), *self.footer]
+
+
+def _lines_tokens(lines: list[str]) -> int:
+    # 줄바꿈 1개 ≈ 1토큰 (헤드라인 그룹 제목처럼 줄 안에 든 줄바꿈 포함)
+    return sum(estimate_tokens(line) + 1 + line.count("\n") for line in lines)
+
+
+def _fit_feed_sections(sections: list[FeedSection], max_tokens: int | None,
+                       reserve: int = FEED_BUDGET_RESERVE) -> list[dict]:
+    """우선순위 단계별 예산 배분 — 단계 안에선 모든 항목을 축약형으로 먼저 채우고 남으면 전체형으로 확장.
+    한 섹션이라도 잘리면 더 낮은 우선순위 섹션은 넣지 않음. (섹션별 유지/전체/축약 수) 생략 보고를 반환"""
+    if max_tokens is None:
+        for section in sections:
+            section.kept = [full for full, _ in section.items]
+        return []
 
+    remaining = max_tokens - reserve
+    for section in sections:
+        section.kept, section.shortened = [], 0
+        if not section.items:
+            # 항목 없는 섹션(제목/빈 헤더)은 항상 출력
+            remaining -= _lines_tokens(section.header) + _lines_tokens(section.footer)
+
+    truncated = False
+    for priority in sorted({s.priority for s in sections}):
+        if truncated:
+            break
+        tier = [s for s in sections if s.priority == priority and s.items]
+        picks: dict[FeedSection, list[list]] = {}
+        # 1단계: 단계 내 전 항목을 축약형(없으면 전체형)으로
+        for section in tier:
+            chosen = picks[section] = []
+            frame_cost = _lines_tokens(section.header) + _lines_tokens(section.footer)
+            for full, compact in section.items:
+                cost = _lines_tokens(compact if compact is not None else full) + (0 if chosen else frame_cost)
+                if cost > remaining:
+                    truncated = True
+                    break
+                remaining -= cost
+                chosen.append([full, compact, compact is None])
+        # 2단계: 단계 전체가 들어갔을 때만 남은 예산으로 전체형 확장
+        if not truncated:
+            for section in tier:
+                for pick in picks[section]:
+                    full, compact, use_full = pick
+                    if use_full:
+                        continue
+                    extra = _lines_tokens(full) - _lines_tokens(compact)
+                    if extra <= remaining:
+                        remaining -= extra
+                        pick[2] = True
+        for section in tier:
+            section.kept = [full if use_full else compact for full, compact, use_full in picks[section]]
+            section.shortened = sum(1 for _, _, use_full in picks[section] if not use_full)
+
+    return [
+        {"section": s.name, "kept": len(s.kept), "total": len(s.items), "shortened": s.shortened}
+        for s in sorted(sections, key=lambda s: s.priority)
+        if len(s.kept) < len(s.items) or s.shortened
+    ]
+
+
+def _feed_budget_note(report: list[dict], max_tokens: int, body_tokens: int) -> str:
+    """생략 보고 줄 (추정 토큰에 보고 줄 자신 포함, 섹션 목록이 길면 섹션 수만)"""
+    detail = ", ".join(
+        f"{r['section']} {r['kept']}/{r['total']}개" + (f"(축약 {r['shortened']})" if r["shortened"] else "")
+        for r in report
+    )
+    if estimate_tokens(detail) > FEED_BUDGET_RESERVE // 2:
+        detail = f"{len(report)}개 섹션"
+    total = body_tokens
+    while True:
+        note = f"> ✂️ 토큰 예산 {max_tokens} 적용 (추정 {total}토큰) — 생략/축약: {detail}"
+        counted = body_tokens + _lines_tokens([note])
+        if counted <= total:
+            return note
+        total = counted
+
+
+def _arrow(change_pct: float) -> str:
+    return "▲" if change_pct > 0 else "▼" if change_pct < 0 else "─"
+
+
+def render_daily_feed(snap: MarketSnapshot, max_tokens: int | None = None) -> str:
+    """수집 데이터 → LLM 입력용 Markdown (max_tokens 지정 시 우선순위대로 예산 내 압축)"""
+    kr, us, forex, news = snap.kr, snap.us, snap.forex, snap.news
+    sections: list[FeedSection] = []
+
+    def section(name, priority, header=None, footer=None) -> FeedSection:
+        sec = FeedSection(name, priority, header, footer)
+        sections.append(sec)
+        return sec
+
+    title = section("제목", 0, [f"# 일일 경제 브리핑 데이터 ({snap.generated_at:%Y년 %m월 %d일 %H:%M} 기준)", ""], [])
+    # 헤드라인 추출 기업 요약 (상단 노출)
+    if snap.extra_names:
+        title.add([f"> 💡 헤드라인에서 추출된 추가 기업: {', '.join(snap.extra_names)}", ""])
+
+    # ── 미국 증시 ──
+    sec = section("미국 지수", 1, ["## 1. 미국 증시 (간밤 마감)"])
+    for name, d in (us.get("indices") or {}).items():
+        line = f"- {name}: {d['close']:,.2f} ({_arrow(d['change_pct'])}{abs(d['change_pct'])}%)"
+        sec.add(line + _trend_note(d.get("trend")), line)
+
+    sec = section("미국 주요 종목", 2, ["### 미국 주요 종목"] if us.get("major_stocks") else [])
+    for name, d in (us.get("major_stocks") or {}).items():
+        line = f"- {name}({d['symbol']}): ${d['close']:,.2f} ({_arrow(d['change_pct'])}{abs(d['change_pct'])}%)"
+        sec.add(line + _trend_note(d.get("trend")), line)
+
+    if snap.extra_us_stocks:
+        sec = section("헤드라인 언급 추가 미국 종목", 2, ["### 헤드라인 언급 추가 미국 종목"])
+        for name, d in snap.extra_us_stocks.items():
+            sec.add(f"- {name}({d['symbol']}): ${d['close']:,.2f} ({_arrow(d['change_pct'])}{abs(d['change_pct'])}%)")
+
+    # ── 한국 증시 ──
+    sec = section("한국 지수", 1, ["## 2. 한국 증시 (전일 마감)"])
+    for key, label in (("kospi", "KOSPI"), ("kosdaq", "KOSDAQ")):
+        if kr.get(key):
+            k = kr[key]
+            line = f"- {label}: {k['close']:,.2f} ({_arrow(k['change_pct'])}{abs(k['change_pct'])}%)"
+            sec.add(line + _trend_note(k.get("trend")), line)
+
+    if kr.get("major_stocks"):
+        sec = section("한국 주요 대형주", 2, ["### 한국 주요 대형주"])
+        for name, d in kr["major_stocks"].items():
+            line = f"- {name}({d['ticker']}): {d['close']:,}원 ({_arrow(d['change_pct'])}{abs(d['change_pct'])}%)"
+            sec.add(line + _trend_note(d.get("trend")), line)
+
+    if snap.extra_kr_stocks:
+        sec = section("헤드라인 언급 추가 한국 종목", 2, ["### 헤드라인 언급 추가 한국 종목"])
+        for name, d in snap.extra_kr_stocks.items():
+            sec.add(f"- {name}({d['ticker']}): {d['close']:,}원 ({_arrow(d['change_pct'])}{abs(d['change_pct'])}%)")
+
+    if kr.get("investor_flow"):
+        sec = section("투자자별 순매수", 3, ["### 투자자별 순매수 (KOSPI)"])
+        for inv, val in kr["investor_flow"].items():
+            sec.add(f"- {inv}: {abs(val):,}원 ({'순매수' if val > 0 else '순매도'})")
+
+    if kr.get("top_gainers"):
+        sec = section("등락률 상위", 3, ["### 등락률 상위 (급등 종목)"])
+        for s in kr["top_gainers"][:7]:
+            sec.add(f"- {s['name']}({s['ticker']}): {s['close']:,}원 (▲{abs(s['change_pct'])}%)")
+
+    if kr.get("top_losers"):
+        sec = section("등락률 하위", 3, ["### 등락률 하위 (급락 종목)"])
+        for s in kr["top_losers"][:7]:
+            sec.add(f"- {s['name']}({s['ticker']}): {s['close']:,}원 (▼{abs(s['change_pct'])}%)")
+
+    if kr.get("top_volume"):
+        sec = section("거래대금 상위", 3, ["### 거래대금 상위 (주목 종목)"])
+        for s in kr["top_volume"][:7]:
+            line = f"- {s['name']}({s['ticker']}): {s['close']:,}원 ({_arrow(s['change_pct'])}{abs(s['change_pct'])}%)"
+            sec.add(f"{line} 거래량:{s['volume']:,}", line)
+
+    # ── 환율/원자재 ──
+    sec = section("환율 및 주요 지표", 1, ["## 3. 환율 및 주요 지표"])
+    for name, d in (forex or {}).items():
+        sec.add(f"- {name}: {d['price']:,.2f} ({_arrow(d['change_pct'])}{abs(d['change_pct'])}%)")
+
+    # ── 뉴스 헤드라인 (Google News RSS) ──
+    sec = section("핵심 뉴스 헤드라인", 4, ["## 4. 핵심 뉴스 헤드라인 (최근 24시간)"])
+    current_keyword = ""
+    for item in news.get("headlines") or []:
+        group = []
+        if item["keyword"] != current_keyword:
+            current_keyword = item["keyword"]
+            group.append(f"\n### [{current_keyword}]")
+        source_str = f" ({item['source']})" if item["source"] else ""
+        if item.get("source_count", 1) > 1:
+            source_str += f" 외 {item['source_count'] - 1}건"
+        sec.add([*group, f"- {item['headline']}{source_str}"], [*group, f"- {item['headline']}"])
+
+    # ── Tavily 심층 뉴스 (고정 + 추가 기업) ──
+    if snap.tavily:
+        sec = section("심층 뉴스 분석", 5, ["## 5. 심층 뉴스 분석 (Tavily)"])
+        current_keyword = ""
+        for item in snap.tavily:
+            group = []
+            if item["keyword"] != current_keyword:
+                current_keyword = item["keyword"]
+                group.append(f"\n### [{current_keyword}]")
+            group.append(f"- **{item['title']}**")
+            full = [*group, f"  > {item['content'][:300]}"] if item.get("content") else group
+            sec.add(full, group)
+
+    # ── Seeking Alpha 애널리스트 데이터 (고정 + 추가 종목) ──
+    if snap.ratings:
+        sec = section("애널리스트 레이팅", 6, ["## 6. 애널리스트 레이팅 (Seeking Alpha)"],
+                      ["- (1=Strong Sell, 3=Hold, 5=Strong Buy)", ""])
+        for r in snap.ratings:
+            parts = [f"**{r['symbol']}**"]
+            if r.get("wall_street"):
+                parts.append(f"월가: {r['wall_street']}")
+            if r.get("quant"):
+                parts.append(f"퀀트: {r['quant']}")
+            if r.get("authors"):
+                parts.append(f"SA분석가: {r['authors']}")
+            sec.add(f"- {' | '.join(parts)}")
+
+    if snap.trending:
+        sec = section("마켓 뉴스", 6, ["## 7. 마켓 뉴스 (Seeking Alpha)"])
+        for article in snap.trending:
+            sec.add(f"- {article['title']}")
+
+    # 보고 줄까지 포함해 max_tokens를 넘으면 넘친 만큼 예약분을 늘려 다시 배치
+    reserve = FEED_BUDGET_RESERVE
+    while True:
+        report = _fit_feed_sections(sections, max_tokens, reserve)
+        lines = [line for sec in sections if sec.kept or not sec.items for line in sec.lines()]
+        if not report:
+            return "\n".join(lines)
+        note = _feed_budget_note(report, max_tokens, _lines_tokens(lines))
+        overflow = _lines_tokens([*lines, note]) - max_tokens
+        if overflow <= 0 or reserve >= max_tokens:
+            return "\n".join([*lines, note])
+        reserve += overflow
+
+
+MARKET_CORE_KEY = "market-snapshot:core"
+MARKET_FULL_KEY = "market-snapshot:full"
+
+
+async def collect_market_core(wl: Watchlist) -> MarketSnapshot:
+    """시장 코어(KR/US/환율) 동시 수집 — 시장별 스냅샷을 거쳐 휴장 중엔 캐시만 사용 (market_ttl)"""
+    kr, us, forex = await asyncio.gather(
+        track_source("kr-market", snapshot_store.get(wl.cache_key("kr-market:5"), lambda: get_kr_market_data(5, wl))),
+        track_source("us-market", snapshot_store.get(wl.cache_key("us-market:5"), lambda: get_us_market_data(5, wl))),
+        track_source("forex", snapshot_store.get(wl.cache_key("forex"), lambda: get_forex_data(wl))),
+        return_exceptions=True,
+    )
+    kr = {} if isinstance(kr, Exception) else kr.data
+    us = {} if isinstance(us, Exception) else us.data
+    forex = {} if isinstance(forex, Exception) else forex.data
+    return MarketSnapshot(datetime.now(), kr, us, forex, wl.name)
+
+
+async def market_core(wl: Watchlist) -> MarketSnapshot:
+    return (await snapshot_store.get(wl.cache_key(MARKET_CORE_KEY), lambda: collect_market_core(wl))).data
+
+
+async def collect_market_snapshot(wl: Watchlist) -> MarketSnapshot:
+    """코어 스냅샷 + 뉴스 → Haiku 기업 추출 → 추가 기업 데이터로 보강"""
+    # ── STEP 1: 코어/Tavily/SA는 백그라운드로, 뉴스 헤드라인은 먼저 ──
+    base = asyncio.gather(
+        market_core(wl),
+        track_source("tavily", get_tavily_news(wl)),
+        track_source("seeking-alpha", get_seeking_alpha_data(wl)),
+        return_exceptions=True,
+    )
     try:
-        # ── STEP 1: 뉴스 헤드라인 먼저 수집 ──
-        news = await get_news_headlines()
-
-        # ── STEP 2: Haiku 기업 추출 + 기존 데이터 병렬 수집 ──
-        (
-            extra_companies,
-            kr, us, forex, tavily, sa,
-        ) = await asyncio.gather(
-            extract_companies_from_headlines(news.get("headlines", [])),
-            get_kr_market_data(),
-            get_us_market_data(),
-            get_forex_data(),
-            get_tavily_news(),
-            get_seeking_alpha_data(),
-            return_exceptions=True,
-        )
-
-        # 예외 처리 (각 수집 실패 시 빈 값으로 폴백)
-        if isinstance(extra_companies, Exception): extra_companies = {"us_tickers": [], "kr_companies": []}
-        if isinstance(kr, Exception): kr = {}
-        if isinstance(us, Exception): us = {}
-        if isinstance(forex, Exception): forex = {}
-        if isinstance(tavily, Exception): tavily = {"results": []}
-        if isinstance(sa, Exception): sa = {"ratings": [], "trending": []}
-
-        extra_us_tickers = extra_companies.get("us_tickers", [])
-        extra_kr_names = extra_companies.get("kr_companies", [])
-        all_extra_names = extra_us_tickers + extra_kr_names
-
-        # ── STEP 3: 추가 기업 데이터 병렬 수집 ──
-        (
-            extra_us_stocks,
-            extra_kr_stocks,
-            extra_tavily_results,
-            extra_sa_ratings,
-        ) = await asyncio.gather(
-            fetch_extra_us_stocks(extra_us_tickers),
-            fetch_extra_kr_stocks(extra_kr_names),
-            fetch_extra_tavily(all_extra_names),
-            fetch_extra_sa_ratings(extra_us_tickers),
-            return_exceptions=True,
-        )
+        news = await track_source("news", get_news_headlines(wl))
+    except Exception:
+        news = {"headlines": []}
 
-        if isinstance(extra_us_stocks, Exception): extra_us_stocks = {}
-        if isinstance(extra_kr_stocks, Exception): extra_kr_stocks = {}
-        if isinstance(extra_tavily_results, Exception): extra_tavily_results = []
-        if isinstance(extra_sa_ratings, Exception): extra_sa_ratings = []
-
-        # ── STEP 4: Markdown 생성 ──
-        today_str = datetime.now().strftime("%Y년 %m월 %d일 %H:%M")
-        lines = []
-
-        lines.append(f"# 일일 경제 브리핑 데이터 ({today_str} 기준)")
-        lines.append("")
-
-        # 헤드라인 추출 기업 요약 (상단 노출)
-        if all_extra_names:
-            lines.append(f"> 💡 헤드라인에서 추출된 추가 기업: {', '.join(all_extra_names)}")
-            lines.append("")
-
-        # ── 미국 증시 ──
-        lines.append("## 1. 미국 증시 (간밤 마감)")
-        if us.get("indices"):
-            for name, data in us["indices"].items():
-                arrow = "▲" if data["change_pct"] > 0 else "▼" if data["change_pct"] < 0 else "─"
-                lines.append(f"- {name}: {data['close']:,.2f} ({arrow}{abs(data['change_pct'])}%)")
-        lines.append("")
-
-        if us.get("major_stocks"):
-            lines.append("### 미국 주요 종목")
-            for name, data in us["major_stocks"].items():
-                arrow = "▲" if data["change_pct"] > 0 else "▼" if data["change_pct"] < 0 else "─"
-                lines.append(f"- {name}({data['symbol']}): ${data['close']:,.2f} ({arrow}{abs(data['change_pct'])}%)")
-        lines.append("")
-
-        if extra_us_stocks:
-            lines.append("### 헤드라인 언급 추가 미국 종목")
-            for name, data in extra_us_stocks.items():
-                arrow = "▲" if data["change_pct"] > 0 else "▼" if data["change_pct"] < 0 else "─"
-                lines.append(f"- {name}({data['symbol']}): ${data['close']:,.2f} ({arrow}{abs(data['change_pct'])}%)")
-            lines.append("")
-
-        # ── 한국 증시 ──
-        lines.append("## 2. 한국 증시 (전일 마감)")
-        if kr.get("kospi"):
-            k = kr["kospi"]
-            arrow = "▲" if k["change_pct"] > 0 else "▼" if k["change_pct"] < 0 else "─"
-            lines.append(f"- KOSPI: {k['close']:,.2f} ({arrow}{abs(k['change_pct'])}%)")
-        if kr.get("kosdaq"):
-            k = kr["kosdaq"]
-            arrow = "▲" if k["change_pct"] > 0 else "▼" if k["change_pct"] < 0 else "─"
-            lines.append(f"- KOSDAQ: {k['close']:,.2f} ({arrow}{abs(k['change_pct'])}%)")
-        lines.append("")
-
-        if kr.get("major_stocks"):
-            lines.append("### 한국 주요 대형주")
-            for name, data in kr["major_stocks"].items():
-                arrow = "▲" if data["change_pct"] > 0 else "▼" if data["change_pct"] < 0 else "─"
-                lines.append(f"- {name}({data['ticker']}): {data['close']:,}원 ({arrow}{abs(data['change_pct'])}%)")
-            lines.append("")
-
-        if extra_kr_stocks:
-            lines.append("### 헤드라인 언급 추가 한국 종목")
-            for name, data in extra_kr_stocks.items():
-                arrow = "▲" if data["change_pct"] > 0 else "▼" if data["change_pct"] < 0 else "─"
-                lines.append(f"- {name}({data['ticker']}): {data['close']:,}원 ({arrow}{abs(data['change_pct'])}%)")
-            lines.append("")
-
-        if kr.get("investor_flow"):
-            lines.append("### 투자자별 순매수 (KOSPI)")
-            for inv, val in kr["investor_flow"].items():
-                arrow = "순매수" if val > 0 else "순매도"
-                lines.append(f"- {inv}: {abs(val):,}원 ({arrow})")
-            lines.append("")
-
-        if kr.get("top_gainers"):
-            lines.append("### 등락률 상위 (급등 종목)")
-            for s in kr["top_gainers"][:7]:
-                lines.append(f"- {s['name']}({s['ticker']}): {s['close']:,}원 (▲{abs(s['change_pct'])}%)")
-            lines.append("")
-
-        if kr.get("top_losers"):
-            lines.append("### 등락률 하위 (급락 종목)")
-            for s in kr["top_losers"][:7]:
-                lines.append(f"- {s['name']}({s['ticker']}): {s['close']:,}원 (▼{abs(s['change_pct'])}%)")
-            lines.append("")
-
-        if kr.get("top_volume"):
-            lines.append("### 거래대금 상위 (주목 종목)")
-            for s in kr["top_volume"][:7]:
-                arrow = "▲" if s["change_pct"] > 0 else "▼" if s["change_pct"] < 0 else "─"
-                lines.append(f"- {s['name']}({s['ticker']}): {s['close']:,}원 ({arrow}{abs(s['change_pct'])}%) 거래량:{s['volume']:,}")
-            lines.append("")
-
-        # ── 환율/원자재 ──
-        lines.append("## 3. 환율 및 주요 지표")
-        if forex:
-            for name, data in forex.items():
-                arrow = "▲" if data["change_pct"] > 0 else "▼" if data["change_pct"] < 0 else "─"
-                lines.append(f"- {name}: {data['price']:,.2f} ({arrow}{abs(data['change_pct'])}%)")
-        lines.append("")
-
-        # ── 뉴스 헤드라인 (Google News RSS) ──
-        lines.append("## 4. 핵심 뉴스 헤드라인 (최근 24시간)")
-        if news.get("headlines"):
-            current_keyword = ""
-            for item in news["headlines"]:
-                if item["keyword"] != current_keyword:
-                    current_keyword = item["keyword"]
-                    lines.append(f"\n### [{current_keyword}]")
-                source_str = f" ({item['source']})" if item["source"] else ""
-                lines.append(f"- {item['headline']}{source_str}")
-        lines.append("")
-
-        # ── Tavily 심층 뉴스 (고정 + 추가 기업) ──
-        all_tavily_results = list(tavily.get("results", [])) + list(extra_tavily_results)
-        if all_tavily_results:
-            lines.append("## 5. 심층 뉴스 분석 (Tavily)")
-            current_keyword = ""
-            for item in all_tavily_results:
-                if item["keyword"] != current_keyword:
-                    current_keyword = item["keyword"]
-                    lines.append(f"\n### [{current_keyword}]")
-                lines.append(f"- **{item['title']}**")
-                if item.get("content"):
-                    lines.append(f"  > {item['content'][:300]}")
-            lines.append("")
-
-        # ── Seeking Alpha 애널리스트 데이터 (고정 + 추가 종목) ──
-        all_ratings = list(sa.get("ratings", [])) + list(extra_sa_ratings)
-        if all_ratings:
-            lines.append("## 6. 애널리스트 레이팅 (Seeking Alpha)")
-            for r in all_ratings:
-                parts = [f"**{r['symbol']}**"]
-                if r.get("wall_street"):
-                    parts.append(f"월가: {r['wall_street']}")
-                if r.get("quant"):
-                    parts.append(f"퀀트: {r['quant']}")
-                if r.get("authors"):
-                    parts.append(f"SA분석가: {r['authors']}")
-                lines.append(f"- {' | '.join(parts)}")
-            lines.append("- (1=Strong Sell, 3=Hold, 5=Strong Buy)")
-            lines.append("")
-
-        if sa.get("trending"):
-            lines.append("## 7. 마켓 뉴스 (Seeking Alpha)")
-            for article in sa["trending"]:
-                lines.append(f"- {article['title']}")
-            lines.append("")
-
-        return "\n".join(lines)
+    # ── STEP 2: Haiku 기업 추출 (코어 수집과 병렬) ──
+    try:
+        extra_companies = await track_source(
+            "extract-companies", extract_companies_from_headlines(news.get("headlines", []), wl))
+    except Exception:
+        extra_companies = {"us_tickers": [], "kr_companies": []}
+    core, tavily, sa = await base
+
+    # 예외 처리 (각 수집 실패 시 빈 값으로 폴백)
+    if isinstance(core, Exception): core = MarketSnapshot(datetime.now(), {}, {}, {}, wl.name)
+    if isinstance(tavily, Exception): tavily = {"results": []}
+    if isinstance(sa, Exception): sa = {"ratings": [], "trending": []}
+
+    extra_us_tickers = extra_companies.get("us_tickers", [])
+    extra_kr_names = extra_companies.get("kr_companies", [])
+    all_extra_names = extra_us_tickers + extra_kr_names
+
+    # ── STEP 3: 추가 기업 데이터 병렬 수집 ──
+    (
+        extra_us_stocks,
+        extra_kr_stocks,
+        extra_tavily_results,
+        extra_sa_ratings,
+    ) = await asyncio.gather(
+        track_source("extra-us-stocks", fetch_extra_us_stocks(extra_us_tickers)),
+        track_source("extra-kr-stocks", fetch_extra_kr_stocks(extra_kr_names)),
+        track_source("extra-tavily", fetch_extra_tavily(all_extra_names)),
+        track_source("extra-sa-ratings", fetch_extra_sa_ratings(extra_us_tickers)),
+        return_exceptions=True,
+    )
+
+    if isinstance(extra_us_stocks, Exception): extra_us_stocks = {}
+    if isinstance(extra_kr_stocks, Exception): extra_kr_stocks = {}
+    if isinstance(extra_tavily_results, Exception): extra_tavily_results = []
+    if isinstance(extra_sa_ratings, Exception): extra_sa_ratings = []
+
+    # 코어는 공유 스냅샷 객체 그대로 (브리핑과 수치 일치)
+    return replace(
+        core,
+        enriched=True,
+        news=news,
+        extra_names=all_extra_names,
+        extra_us_stocks=extra_us_stocks,
+        extra_kr_stocks=extra_kr_stocks,
+        tavily=cluster_near_duplicates(
+            list(tavily.get("results", [])) + list(extra_tavily_results), "title", _url_domain,
+        ),
+        ratings=list(sa.get("ratings", [])) + list(extra_sa_ratings),
+        trending=list(sa.get("trending", [])),
+    )
+
+
+async def market_snapshot(wl: Watchlist) -> MarketSnapshot:
+    return (await snapshot_store.get(wl.cache_key(MARKET_FULL_KEY), lambda: collect_market_snapshot(wl))).data
+
+
+async def latest_market_core(wl: Watchlist) -> MarketSnapshot:
+    """보강 스냅샷이 유효하면 그 코어를 그대로 사용 (피드와 브리핑 수치 일치), 없으면 코어만 수집"""
+    full = snapshot_store.peek(wl.cache_key(MARKET_FULL_KEY))
+    if full is not None and full.fresh:
+        return full.data
+    return await market_core(wl)
+
+
+# 출력 형식 → (렌더러(snap, **opts), media_type, 보강 스냅샷 필요 여부)
+SNAPSHOT_RENDERERS: dict[str, tuple] = {}
+
+
+def snapshot_renderer(name: str, media_type: str = "application/json", enriched: bool = True):
+    """MarketSnapshot 렌더러 등록 (형식 추가 시 업스트림 재수집 없음)"""
+    def register(fn):
+        SNAPSHOT_RENDERERS[name] = (fn, media_type, enriched)
+        return fn
+    return register
+
+
+async def render_market_snapshot(fmt: str, watchlist: Watchlist | None = None, **opts):
+    fn, _, enriched = SNAPSHOT_RENDERERS[fmt]
+    wl = watchlist or watchlists.get()
+    snap = await (market_snapshot(wl) if enriched else latest_market_core(wl))
+    return fn(snap, **opts)
+
+
+@snapshot_renderer("json")
+def _render_snapshot_json(snap: MarketSnapshot, **_):
+    return snap
+
+
+@snapshot_renderer("markdown", "text/plain; charset=utf-8")
+def _render_snapshot_markdown(snap: MarketSnapshot, max_tokens: int | None = None, **_):
+    return render_daily_feed(snap, max_tokens)
+
+
+async def get_daily_feed(max_tokens: int | None = None, watchlist: Watchlist | None = None) -> str:
+    """모든 데이터를 수집하여 LLM 입력용 Markdown 텍스트로 병합"""
+    try:
+        return await render_market_snapshot("markdown", watchlist, max_tokens=max_tokens)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/daily-feed", response_class=PlainTextResponse)
+async def api_daily_feed(request: Request, max_tokens: int | None = None, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    if max_tokens is not None and max_tokens < FEED_BUDGET_RESERVE * 2:
+        raise HTTPException(status_code=400, detail=f"max_tokens는 {FEED_BUDGET_RESERVE * 2} 이상이어야 합니다")
+    return await cached_response(request, wl.cache_key(f"daily-feed:{max_tokens or 'full'}"),
+                                 lambda: get_daily_feed(max_tokens, wl),
+                                 media_type="text/plain; charset=utf-8")
+
+
+@app.get("/api/market-snapshot")
+async def api_market_snapshot(request: Request, format: str = "json", max_tokens: int | None = None,
+                              watchlist: str = DEFAULT_WATCHLIST):
+    """통합 시장 스냅샷을 원하는 형식으로 렌더링 (json | markdown | briefing)"""
+    wl = resolve_watchlist(watchlist)
+    if format not in SNAPSHOT_RENDERERS:
+        raise HTTPException(status_code=400, detail=f"format은 {sorted(SNAPSHOT_RENDERERS)} 중 하나여야 합니다")
+    if max_tokens is not None and max_tokens < FEED_BUDGET_RESERVE * 2:
+        raise HTTPException(status_code=400, detail=f"max_tokens는 {FEED_BUDGET_RESERVE * 2} 이상이어야 합니다")
+    return await cached_response(request, wl.cache_key(f"market-snapshot:{format}:{max_tokens or 'full'}"),
+                                 lambda: render_market_snapshot(format, wl, max_tokens=max_tokens),
+                                 media_type=SNAPSHOT_RENDERERS[format][1])
+
+
 # ============================================================
 # 7. 주제 기반 Google News + Seeking Alpha 리서치
 # ============================================================
-@app.get("/api/topic-research")
+TOPIC_CACHE_TTL = int(os.environ.get("TOPIC_CACHE_TTL", "1800"))  # 초
+TOPIC_CACHE_MAX = 1024
+TOPIC_NEWS_WINDOW = "3d"
+TOPIC_NEWS_LIMIT = 10
+TOPIC_MAX_TICKERS = 5
+
+# 호스트별 동시 요청 상한 (배치 리서치에서 업스트림 과부하/차단 방지)
+HOST_CONCURRENCY = {
+    "news.google.com": 8,
+    "seeking-alpha.p.rapidapi.com": 3,
+}
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+# 기본 executor(cpu+4 스레드)는 Railway 소형 인스턴스에서 금방 포화되므로 I/O 전용 풀 사용
+_upstream_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream")
+
+
+async def run_on_host(host: str, fn, *args, **kwargs):
+    """블로킹 호출을 스레드에서 실행하되 호스트별 동시 실행 수를 제한"""
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        sem = _host_semaphores[host] = asyncio.Semaphore(HOST_CONCURRENCY.get(host, 4))
+    async with sem:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_upstream_executor, functools.partial(fn, *args, **kwargs))
+
+
+class TTLCache:
+    """키별 결과 TTL 캐시 + 진행 중 요청 합치기 (같은 키 동시 요청은 1회만 호출)"""
+
+    def __init__(self, ttl: float, max_items: int):
+        self._ttl = ttl
+        self._max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+        self._inflight: dict = {}
+
+    async def get_or_fetch(self, key, fetch):
+        hit = self._items.get(key)
+        if hit is not None and hit[0] > time.monotonic():
+            return hit[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda t: self._store(key, t))
+        return await asyncio.shield(task)
+
+    def _store(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._items[key] = (time.monotonic() + self._ttl, task.result())
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+
+
+topic_cache = TTLCache(TOPIC_CACHE_TTL, TOPIC_CACHE_MAX)
+
+
+def _sa_rating(symbol: str) -> dict | None:
+    """종목 레이팅 (레이팅 없음은 None, 호출 실패는 예외 → 주제 캐시에 남지 않음)"""
+    data = _sa_fetch("/symbols/get-ratings", {"symbol": symbol})
+    if data and "data" in data and isinstance(data["data"], list) and len(data["data"]) > 0:
+        try:
+            r = data["data"][0].get("attributes", {}).get("ratings", {})
+            return {
+                "symbol": symbol,
+                "wall_street": round(r.get("sellSideRating", 0), 2) if r.get("sellSideRating") else "",
+                "quant": round(r.get("quantRating", 0), 2) if r.get("quantRating") else "",
+                "authors": round(r.get("authorsRating", 0), 2) if r.get("authorsRating") else "",
+            }
+        except Exception:
+            return None
+    return None
+
+
+async def _cached_topic_news(query: str, lang: str) -> list[dict]:
+    # 실패(브레이커 open 포함)는 예외로 올려 캐시하지 않음 → 복구 후 바로 재조회
+    async def fetch():
+        return await run_on_host("news.google.com", fetch_google_news,
+                                 query, lang, TOPIC_NEWS_WINDOW, TOPIC_NEWS_LIMIT)
+    return await topic_cache.get_or_fetch(("news", query, lang, TOPIC_NEWS_WINDOW), fetch)
+
+
+async def _cached_sa_rating(symbol: str) -> dict | None:
+    async def fetch():
+        return await run_on_host("seeking-alpha.p.rapidapi.com", _sa_rating, symbol)
+    return await topic_cache.get_or_fetch(("sa-rating", symbol), fetch)
+
+
+class TopicQuery(BaseModel):
+    topic: str = ""
+    topic_en: str = ""
+    tickers: str | list[str] = ""
+
+    def ticker_list(self) -> list[str]:
+        raw = self.tickers.split(",") if isinstance(self.tickers, str) else self.tickers
+        # 레지스트리 검증 결과(BRK-B)와 같은 표기로 정규화해야 레이팅이 매칭됨
+        return list(dict.fromkeys(us_symbols.normalize(t) for t in raw if t.strip()))[:TOPIC_MAX_TICKERS]
+
+
+class TopicBatchRequest(BaseModel):
+    topics: list[TopicQuery]
+
+
+async def research_topics(queries: list[TopicQuery]) -> list[dict]:
+    """여러 주제의 뉴스(한/영) + SA 레이팅을 중복 제거 후 한 번에 병렬 수집"""
+    news_keys = {(q.topic, "ko") for q in queries if q.topic} | {(q.topic_en, "en") for q in queries if q.topic_en}
+    symbols = set(await us_symbols.validate([t for q in queries for t in q.ticker_list()])) if RAPIDAPI_KEY else set()
+
+    news_keys, symbols = list(news_keys), list(symbols)
+    fetched = await asyncio.gather(
+        *(track_source(f"news:{lang}:{query}", _cached_topic_news(query, lang)) for query, lang in news_keys),
+        *(track_source(f"seeking-alpha:{symbol}", _cached_sa_rating(symbol)) for symbol in symbols),
+        return_exceptions=True,
+    )
+    news = {key: [] if isinstance(r, Exception) else r for key, r in zip(news_keys, fetched)}
+    ratings = {s: None if isinstance(r, Exception) else r for s, r in zip(symbols, fetched[len(news_keys):])}
+
+    return [
+        {
+            "google_news_kr": list(news.get((q.topic, "ko"), [])),
+            "google_news_en": list(news.get((q.topic_en, "en"), [])),
+            "seeking_alpha_ratings": [ratings[t] for t in q.ticker_list() if ratings.get(t)],
+        }
+        for q in queries
+    ]
+
+
 async def get_topic_research(topic: str = "", topic_en: str = "", tickers: str = ""):
     """특정주제용: topic 기반 Google News(한/영) + Seeking Alpha 레이팅"""
+    return (await research_topics([TopicQuery(topic=topic, topic_en=topic_en, tickers=tickers)]))[0]
+
+
+@app.get("/api/topic-research")
+async def api_topic_research(request: Request, topic: str = "", topic_en: str = "", tickers: str = ""):
+    return await cached_response(
+        request, f"topic-research:{topic}|{topic_en}|{tickers}",
+        lambda: get_topic_research(topic, topic_en, tickers),
+    )
+
+
+@app.post("/api/topic-research/batch")
+async def topic_research_batch(req: TopicBatchRequest):
+    """여러 주제 일괄 리서치 (공통 검색어/티커는 1회만 조회, 호스트별 동시성 제한, 주제 캐시)"""
+    started = time.perf_counter()
+    results = await research_topics(req.topics)
+    return {
+        "count": len(results),
+        "results": [
+            {"topic": q.topic, "topic_en": q.topic_en, "tickers": q.ticker_list(), **r}
+            for q, r in zip(req.topics, results)
+        ],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# ============================================================
+# 8. 통합 JSON 데이터 (기존 호환)
+# ============================================================
+@snapshot_renderer("briefing", enriched=False)
+def _render_snapshot_briefing(snap: MarketSnapshot, **_):
+    return {
+        "timestamp": snap.generated_at.isoformat(),
+        "kr_market": snap.kr,
+        "us_market": snap.us,
+        "forex": snap.forex,
+    }
+
+
+async def get_daily_briefing(watchlist: Watchlist | None = None):
+    """한국+미국 증시 + 환율 통합 JSON 데이터"""
+    try:
+        return await render_market_snapshot("briefing", watchlist)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/daily-briefing")
+async def api_daily_briefing(request: Request, watchlist: str = DEFAULT_WATCHLIST):
+    wl = resolve_watchlist(watchlist)
+    return await cached_response(request, wl.cache_key("daily-briefing"), lambda: get_daily_briefing(wl))
+
+
+# ============================================================
+# 9. 변경분(델타) 조회 — since=<version> 이후 바뀐 섹션/항목만 반환
+# ============================================================
+DELTA_REMOVED_KEEP = 500  # 섹션별 삭제 기록 보관 개수 (넘치면 오래된 토큰은 전체 응답)
+
+_BOOT_ID = hashlib.blake2b(str(time.time_ns()).encode(), digest_size=3).hexdigest()
+
+
+def _kr_delta_sections(kr: dict) -> dict:
+    movers = {}
+    for list_name in ("top_volume", "top_gainers", "top_losers"):
+        for s in kr.get(list_name) or []:
+            movers[f"{list_name}:{s['ticker']}"] = {"list": list_name, **s}
+    return {
+        "kr.indices": {k.upper(): kr[k] for k in ("kospi", "kosdaq") if kr.get(k)},
+        "kr.major_stocks": dict(kr.get("major_stocks") or {}),
+        "kr.movers": movers,
+        "kr.investor_flow": dict(kr.get("investor_flow") or {}),
+    }
+
+
+def _us_delta_sections(us: dict) -> dict:
+    return {
+        "us.indices": dict(us.get("indices") or {}),
+        "us.major_stocks": dict(us.get("major_stocks") or {}),
+    }
+
+
+def _sa_delta_sections(sa: dict) -> dict:
+    return {
+        "seeking_alpha.ratings": {r["symbol"]: r for r in sa.get("ratings", [])},
+        "seeking_alpha.trending": {a["title"]: a for a in sa.get("trending", [])},
+    }
+
+
+# 데이터셋(스냅샷 키) → 델타 섹션 추출기
+DELTA_DATASETS = {
+    "kr-market:5": _kr_delta_sections,
+    "us-market:5": _us_delta_sections,
+    "forex": lambda fx: {"forex": dict(fx)},
+    "news": lambda news: {"headlines": {h["headline"]: h for h in news.get("headlines", [])}},
+    "tavily-news": lambda tv: {"tavily": {r["url"]: r for r in tv.get("results", [])}},
+    "seeking-alpha": _sa_delta_sections,
+}
+
+DELTA_BUILDERS = {
+    "kr-market:5": lambda: get_kr_market_data(5),
+    "us-market:5": lambda: get_us_market_data(5),
+    "forex": lambda: get_forex_data(),
+    "news": lambda: get_news_headlines(),
+    "tavily-news": lambda: get_tavily_news(),
+    "seeking-alpha": lambda: get_seeking_alpha_data(),
+}
+
+
+_DELTA_SECTION_PREFIXES = {
+    "kr-market:5": ("kr.",),
+    "us-market:5": ("us.",),
+    "forex": ("forex",),
+    "news": ("headlines",),
+    "tavily-news": ("tavily",),
+    "seeking-alpha": ("seeking_alpha.",),
+}
+
+
+class DeltaTracker:
+    """섹션별 항목 해시와 변경 시퀀스를 기록해 since 토큰 이후 변경분만 계산.
+
+    버전 토큰은 "<부팅ID>-<시퀀스>" 형식이며, 재시작 전 토큰이나 삭제 기록이
+    잘려나간 오래된 토큰이 오면 전체 데이터를 돌려준다."""
+
+    def __init__(self):
+        self._seq = 0
+        self._floor = 0
+        self._items: dict[str, dict[str, tuple[str, int, dict]]] = {}
+        self._removed: dict[str, OrderedDict[str, int]] = {}
+        self._section_seq: dict[str, int] = {}
+        self._observed: dict[str, str] = {}
+
+    def _token(self, seq: int) -> str:
+        return f"{_BOOT_ID}-{seq}"
+
+    @property
+    def version(self) -> str:
+        return self._token(self._seq)
+
+    def _parse(self, token: str | None) -> int | None:
+        if not token:
+            return None
+        boot, _, seq = token.rpartition("-")
+        if boot != _BOOT_ID or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq < self._floor or seq > self._seq:
+            return None
+        return seq
+
+    def observe(self, dataset: str, snap: Snapshot):
+        """스냅샷 버전이 바뀐 경우에만 섹션 항목을 다시 비교"""
+        if self._observed.get(dataset) == snap.version:
+            return
+        self._observed[dataset] = snap.version
+        self.ingest(DELTA_DATASETS[dataset](snap.data))
+
+    def ingest(self, sections: dict[str, dict]):
+        next_seq = self._seq + 1
+        bumped = False
+        for name, items in sections.items():
+            current = self._items.setdefault(name, {})
+            removed = self._removed.setdefault(name, OrderedDict())
+            changed = False
+            for key, item in items.items():
+                h = _content_version(item)
+                prev = current.get(key)
+                if prev is None or prev[0] != h:
+                    current[key] = (h, next_seq, item)
+                    removed.pop(key, None)
+                    changed = True
+            for key in [k for k in current if k not in items]:
+                del current[key]
+                removed[key] = next_seq
+                changed = True
+            while len(removed) > DELTA_REMOVED_KEEP:
+                _, dropped_seq = removed.popitem(last=False)
+                self._floor = max(self._floor, dropped_seq)
+            if changed:
+                self._section_seq[name] = next_seq
+                bumped = True
+        if bumped:
+            self._seq = next_seq
+
+    def delta(self, since: str | None, prefixes: tuple[str, ...] | None = None) -> dict:
+        seq = self._parse(since)
+        sections = {}
+        for name, current in self._items.items():
+            if prefixes is not None and not name.startswith(prefixes):
+                continue
+            if seq is not None and self._section_seq.get(name, 0) <= seq:
+                continue
+            changed = {k: item for k, (_, s, item) in current.items() if seq is None or s > seq}
+            removed = [k for k, s in self._removed.get(name, {}).items() if seq is not None and s > seq]
+            if changed or removed:
+                sections[name] = {
+                    "version": self._token(self._section_seq.get(name, 0)),
+                    "changed": changed,
+                    "removed": removed,
+                }
+        return {
+            "version": self.version,
+            "since": since,
+            "full": seq is None,
+            "sections": sections,
+        }
+
+
+delta_tracker = DeltaTracker()
+
+
+async def collect_delta(since: str | None, datasets: list[str]) -> dict:
+    """데이터셋 스냅샷을 (캐시 우선) 병렬 수집 후 since 이후 변경분 계산"""
+    snaps = await asyncio.gather(
+        *(snapshot_store.get(name, DELTA_BUILDERS[name]) for name in datasets),
+        return_exceptions=True,
+    )
+    failed = []
+    for name, snap in zip(datasets, snaps):
+        if isinstance(snap, Exception):
+            failed.append(name)  # 수집 실패 데이터셋은 삭제로 취급하지 않음
+            continue
+        delta_tracker.observe(name, snap)
+
+    prefixes = tuple(
+        section for name in datasets if name not in failed
+        for section in _DELTA_SECTION_PREFIXES[name]
+    )
+    result = delta_tracker.delta(since, prefixes)
+    if failed:
+        result["failed"] = failed
+    return result
+
+
+@app.get("/api/daily-feed/delta")
+async def api_daily_feed_delta(since: str = ""):
+    """일일 피드 구성 데이터(지수/종목/등락/수급/환율/헤드라인/Tavily/SA) 중 since 이후 변경분"""
+    result = await collect_delta(since or None, list(DELTA_DATASETS))
+    return Response(content=_dump_json(result), media_type="application/json")
+
+
+# ============================================================
+# 10. 웹훅 푸시 (피드/브리핑 스냅샷 갱신 시 구독자에게 POST, 영구 outbox + 재시도)
+# ============================================================
+WEBHOOK_DB = os.environ.get("WEBHOOK_DB", "webhooks.db")
+WEBHOOK_TIMEOUT = 10                 # 초
+WEBHOOK_MAX_ATTEMPTS = 8             # 초과 시 dead 처리
+WEBHOOK_BACKOFF_BASE = 5             # 초, 시도마다 2배
+WEBHOOK_BACKOFF_MAX = 1800           # 초
+WEBHOOK_BATCH = 16                   # 한 번에 전송할 outbox 건수
+WEBHOOK_IDLE_SECONDS = 60            # 대기 건이 없을 때 outbox 재확인 주기
+WEBHOOK_DEAD_KEEP_SECONDS = 7 * 86400
+WEBHOOK_REFRESH_SECONDS = int(os.environ.get("WEBHOOK_REFRESH_SECONDS", "300"))  # 장중 구독 피드 재수집 주기
+# LLM/검색 API를 쓰는 보강 피드는 장중에도 이 주기보다 자주 재수집하지 않음 (쿼터 보호)
+WEBHOOK_ENRICHED_REFRESH_SECONDS = int(os.environ.get("WEBHOOK_ENRICHED_REFRESH_SECONDS", "1800"))
+# 구독 등록/조회/삭제용 토큰 (X-Webhook-Token). 비어 있으면 웹훅 API 비활성화
+WEBHOOK_REGISTRATION_TOKEN = os.environ.get("WEBHOOK_REGISTRATION_TOKEN", "")
+# 사설/루프백/링크로컬 주소로 해석돼도 허용할 호스트 (쉼표 구분, 내부망 수신기용)
+WEBHOOK_ALLOWED_HOSTS = {h.strip().lower() for h in os.environ.get("WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()}
+
+# 피드 종류 → (스냅샷 키, 빌더, 시장). 시장 None은 KR/US 공통 피드
+WEBHOOK_FEEDS = {
+    "daily-feed": ("daily-feed:full", lambda: get_daily_feed(), None),
+    "daily-briefing": ("daily-briefing", get_daily_briefing, None),
+    "kr-market": ("kr-market:5", lambda: get_kr_market_data(5), "kr"),
+    "us-market": ("us-market:5", lambda: get_us_market_data(5), "us"),
+}
+WEBHOOK_MARKETS = {"kr", "us"}
+WEBHOOK_ENRICHED_FEEDS = {"daily-feed"}
+_WEBHOOK_MARKET_CALENDARS = {"kr": (KRX,), "us": (NYSE,), None: (KRX, NYSE)}
+_WEBHOOK_KEY_TO_FEED = {key: feed for feed, (key, _, _) in WEBHOOK_FEEDS.items()}
+
+
+class WebhookOutbox:
+    """구독자 + 전송 대기열 (SQLite, 재시작 후에도 미전송분 유지)"""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS subscribers (
+                    id TEXT PRIMARY KEY, url TEXT NOT NULL, feeds TEXT NOT NULL,
+                    markets TEXT NOT NULL, secret TEXT, created_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subscriber_id TEXT NOT NULL, feed TEXT NOT NULL, version TEXT NOT NULL,
+                    payload BLOB NOT NULL, status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL,
+                    last_error TEXT, updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+                CREATE TABLE IF NOT EXISTS published (
+                    feed TEXT PRIMARY KEY, version TEXT NOT NULL, updated_at REAL NOT NULL
+                );
+            """)
+
+    def _query(self, sql: str, params=()) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def add_subscriber(self, url: str, feeds: list[str], markets: list[str], secret: str | None) -> dict:
+        sub_id = os.urandom(8).hex()
+        created_at = datetime.now().isoformat()
+        self._query(
+            "INSERT INTO subscribers VALUES (?, ?, ?, ?, ?, ?)",
+            (sub_id, url, json.dumps(feeds), json.dumps(markets), secret, created_at),
+        )
+        return {"id": sub_id, "url": url, "feeds": feeds, "markets": markets,
+                "signed": bool(secret), "created_at": created_at}
+
+    def remove_subscriber(self, sub_id: str) -> bool:
+        with self._lock:
+            removed = self._db.execute("DELETE FROM subscribers WHERE id = ?", (sub_id,)).rowcount
+            self._db.execute("DELETE FROM outbox WHERE subscriber_id = ?", (sub_id,))
+        return removed > 0
+
+    def subscribers(self) -> list[dict]:
+        counts = {
+            (sub_id, status): n for sub_id, status, n in self._query(
+                "SELECT subscriber_id, status, COUNT(*) FROM outbox GROUP BY subscriber_id, status")
+        }
+        return [
+            {"id": sub_id, "url": url, "feeds": json.loads(feeds), "markets": json.loads(markets),
+             "signed": bool(secret), "created_at": created_at,
+             "pending": counts.get((sub_id, "pending"), 0), "dead": counts.get((sub_id, "dead"), 0)}
+            for sub_id, url, feeds, markets, secret, created_at in self._query(
+                "SELECT id, url, feeds, markets, secret, created_at FROM subscribers ORDER BY created_at")
+        ]
+
+    def subscribed_feeds(self) -> set[str]:
+        feeds = set()
+        for (raw,) in self._query("SELECT feeds FROM subscribers"):
+            feeds.update(json.loads(raw) or WEBHOOK_FEEDS)
+        return feeds
+
+    def enqueue(self, feed: str, version: str, payload: bytes, subscriber_id: str | None = None) -> int:
+        """feed를 구독하는 구독자에게 적재 (미전송 건이 있으면 최신 내용으로 교체)"""
+        market = WEBHOOK_FEEDS[feed][2]
+        now = time.time()
+        queued = 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, feeds, markets FROM subscribers WHERE ? IS NULL OR id = ?",
+                (subscriber_id, subscriber_id),
+            ).fetchall()
+            for sub_id, feeds, markets in rows:
+                feeds, markets = json.loads(feeds), json.loads(markets)
+                if feeds and feed not in feeds:
+                    continue
+                if markets and market is not None and market not in markets:
+                    continue
+                updated = self._db.execute(
+                    "UPDATE outbox SET version = ?, payload = ?, updated_at = ? "
+                    "WHERE subscriber_id = ? AND feed = ? AND status = 'pending'",
+                    (version, payload, now, sub_id, feed),
+                ).rowcount
+                if not updated:
+                    self._db.execute(
+                        "INSERT INTO outbox (subscriber_id, feed, version, payload, next_attempt, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (sub_id, feed, version, payload, now, now),
+                    )
+                queued += 1
+        return queued
+
+    def mark_published(self, feed: str, version: str) -> bool:
+        """feed의 마지막 발행 버전 갱신 — 이미 같은 버전을 발행했으면 False (재시작 후에도 유지)"""
+        with self._lock:
+            return self._db.execute(
+                "INSERT INTO published VALUES (?, ?, ?) "
+                "ON CONFLICT(feed) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at "
+                "WHERE published.version != excluded.version",
+                (feed, version, time.time()),
+            ).rowcount > 0
+
+    def due(self, limit: int) -> list[tuple]:
+        return self._query(
+            "SELECT o.id, o.feed, o.version, o.payload, o.attempts, s.url, s.secret "
+            "FROM outbox o JOIN subscribers s ON s.id = o.subscriber_id "
+            "WHERE o.status = 'pending' AND o.next_attempt <= ? ORDER BY o.next_attempt LIMIT ?",
+            (time.time(), limit),
+        )
+
+    def seconds_until_due(self) -> float | None:
+        rows = self._query("SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'")
+        if not rows or rows[0][0] is None:
+            return None
+        return max(0.0, rows[0][0] - time.time())
+
+    def mark_done(self, row_id: int, version: str):
+        # 전송 중 새 버전으로 교체됐으면 남겨 두고 다시 보냄
+        self._query("DELETE FROM outbox WHERE id = ? AND version = ?", (row_id, version))
+
+    def mark_failed(self, row_id: int, attempts: int, error: str):
+        attempts += 1
+        if attempts >= WEBHOOK_MAX_ATTEMPTS:
+            self._query(
+                "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (attempts, error, time.time(), row_id),
+            )
+            return
+        delay = min(WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1), WEBHOOK_BACKOFF_MAX)
+        delay *= random.uniform(0.8, 1.2)
+        self._query(
+            "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            (attempts, time.time() + delay, error, time.time(), row_id),
+        )
+
+    def prune_dead(self):
+        self._query("DELETE FROM outbox WHERE status = 'dead' AND updated_at < ?",
+                    (time.time() - WEBHOOK_DEAD_KEEP_SECONDS,))
+
+
+# import 시 작업 디렉터리에 DB가 생기지 않도록 lifespan 시작 시 연결
+webhook_outbox: WebhookOutbox | None = None
+_webhook_wakeup = asyncio.Event()
+_webhook_refresh_now = asyncio.Event()
+_webhook_tasks: list[asyncio.Task] = []
+
+
+def _publish_snapshot(snap: Snapshot, subscriber_id: str | None = None):
+    """SnapshotStore 리스너: 구독 대상 스냅샷이 새 버전이면 outbox 적재"""
+    feed = _WEBHOOK_KEY_TO_FEED.get(snap.key)
+    if feed is None or webhook_outbox is None:
+        return
+    # 전체 발행은 내용(버전)이 직전 발행과 다를 때만 (등록 직후 개별 전송은 항상)
+    if subscriber_id is None and not webhook_outbox.mark_published(feed, snap.version):
+        return
+    payload = _dump_json({
+        "event": "snapshot.updated",
+        "feed": feed,
+        "version": snap.version,
+        "created_at": snap.created_at.isoformat(),
+        "data": snap.data,
+    })
+    if webhook_outbox.enqueue(feed, snap.version, payload, subscriber_id):
+        _webhook_wakeup.set()
+
+
+snapshot_store.listeners.append(_publish_snapshot)
+
+
+async def _webhook_target_error(url: str) -> str | None:
+    """전송 대상 검사 — 허용 목록 밖 호스트가 공인 주소가 아닌 곳으로 해석되면 사유 반환 (SSRF 방지)"""
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return "url은 http(s)여야 합니다"
+    host = parts.hostname
+    if not host:
+        return "url에 호스트가 없습니다"
+    if host in WEBHOOK_ALLOWED_HOSTS:
+        return None
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, parts.port or (443 if parts.scheme == "https" else 80), proto=6)
+    except Exception:
+        return f"호스트를 해석할 수 없습니다: {host}"
+    for *_, sockaddr in infos:
+        ip = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            return f"허용되지 않는 대상 주소: {host} → {ip}"
+    return None
+
+
+def _post_webhook(url: str, payload: bytes, headers: dict) -> int:
     import urllib.request
-    import xml.etree.ElementTree as ET
-    from urllib.parse import quote
 
-    result = {
-        "google_news_kr": [],
-        "google_news_en": [],
-        "seeking_alpha_ratings": [],
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        # 리다이렉트로 내부 주소 검사를 우회하지 못하도록 3xx는 실패 처리
+        def redirect_request(self, *args):
+            return None
+
+    req = urllib.request.Request(url, data=payload, headers=headers, method="POST")
+    with urllib.request.build_opener(NoRedirect).open(req, timeout=WEBHOOK_TIMEOUT) as resp:
+        return resp.status
+
+
+async def _deliver_webhook(row: tuple):
+    from urllib.parse import urlsplit
+
+    row_id, feed, version, payload, attempts, url, secret = row
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "stock-data-api-webhook",
+        "X-Webhook-Event": feed,
+        "X-Webhook-Delivery": str(row_id),
     }
+    if secret:
+        digest = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+        headers["X-Webhook-Signature"] = f"sha256={digest}"
+    try:
+        # 등록 이후 DNS가 바뀌었을 수 있으므로 전송 때마다 재검사
+        error = await _webhook_target_error(url)
+        if error:
+            raise ValueError(error)
+        await run_on_host(urlsplit(url).netloc, _post_webhook, url, payload, headers)
+        webhook_outbox.mark_done(row_id, version)
+    except Exception as e:
+        webhook_outbox.mark_failed(row_id, attempts, str(e)[:500])
 
-    # Google News 한국어 (topic 기반, 최근 3일)
-    if topic:
+
+async def _webhook_worker():
+    """outbox 전송 루프 (대기 건이 없으면 적재 알림 또는 다음 재시도 시각까지 대기)"""
+    while True:
+        _webhook_wakeup.clear()
         try:
-            encoded = quote(topic)
-            url = f"https://news.google.com/rss/search?q={encoded}+when:3d&hl=ko&gl=KR&ceid=KR:ko"
-            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                xml_data = resp.read()
-            root = ET.fromstring(xml_data)
-            for item in root.findall(".//item")[:10]:
-                title = item.find("title")
-                source = item.find("source")
-                pub_date = item.find("pubDate")
-                if title is not None and title.text:
-                    result["google_news_kr"].append({
-                        "headline": title.text.strip(),
-                        "source": source.text.strip() if source is not None and source.text else "",
-                        "date": pub_date.text.strip() if pub_date is not None and pub_date.text else "",
-                    })
+            rows = webhook_outbox.due(WEBHOOK_BATCH)
+            if rows:
+                await asyncio.gather(*(_deliver_webhook(row) for row in rows))
+                continue
+            wait = webhook_outbox.seconds_until_due()
         except Exception:
+            wait = None
+        try:
+            await asyncio.wait_for(_webhook_wakeup.wait(), WEBHOOK_IDLE_SECONDS if wait is None else wait)
+        except asyncio.TimeoutError:
             pass
 
-    # Google News 영어 (topic_en 기반, 최근 3일)
-    if topic_en:
+
+def _webhook_refresh_due(feed: str, last_refreshed: float | None) -> bool:
+    """재수집 필요 여부 — 최초 1회 이후엔 관련 시장이 장중/확정 대기 중일 때만"""
+    if last_refreshed is None:
+        return True
+    interval = WEBHOOK_ENRICHED_REFRESH_SECONDS if feed in WEBHOOK_ENRICHED_FEEDS else WEBHOOK_REFRESH_SECONDS
+    if time.monotonic() - last_refreshed < interval:
+        return False
+    return any(cal.seconds_until_change() == 0 for cal in _WEBHOOK_MARKET_CALENDARS[WEBHOOK_FEEDS[feed][2]])
+
+
+def _webhook_refresh_wait(feeds: set[str]) -> float:
+    """다음 재수집까지 대기 초 (장중이면 WEBHOOK_REFRESH_SECONDS, 휴장 중이면 가장 이른 개장까지)"""
+    calendars = {cal for feed in feeds for cal in _WEBHOOK_MARKET_CALENDARS[WEBHOOK_FEEDS[feed][2]]}
+    if not calendars:
+        return WEBHOOK_REFRESH_SECONDS
+    until_change = min(cal.seconds_until_change() for cal in calendars)
+    return max(float(WEBHOOK_REFRESH_SECONDS), until_change)
+
+
+async def _webhook_refresher():
+    """구독 중인 피드를 거래소 달력에 맞춰 재수집 (내용이 바뀌었을 때만 리스너가 적재)"""
+    last_refreshed: dict[str, float] = {}
+    while True:
+        _webhook_refresh_now.clear()
         try:
-            encoded = quote(topic_en)
-            url = f"https://news.google.com/rss/search?q={encoded}+when:3d&hl=en&gl=US&ceid=US:en"
-            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                xml_data = resp.read()
-            root = ET.fromstring(xml_data)
-            for item in root.findall(".//item")[:10]:
-                title = item.find("title")
-                source = item.find("source")
-                pub_date = item.find("pubDate")
-                if title is not None and title.text:
-                    result["google_news_en"].append({
-                        "headline": title.text.strip(),
-                        "source": source.text.strip() if source is not None and source.text else "",
-                        "date": pub_date.text.strip() if pub_date is not None and pub_date.text else "",
-                    })
+            feeds = webhook_outbox.subscribed_feeds()
+            webhook_outbox.prune_dead()
         except Exception:
+            feeds = set()
+        for feed in sorted(feeds):
+            if not _webhook_refresh_due(feed, last_refreshed.get(feed)):
+                continue
+            key, builder, _ = WEBHOOK_FEEDS[feed]
+            try:
+                await snapshot_store.get(key, builder)
+                last_refreshed[feed] = time.monotonic()
+            except Exception:
+                continue
+        try:
+            await asyncio.wait_for(_webhook_refresh_now.wait(), _webhook_refresh_wait(feeds))
+        except asyncio.TimeoutError:
             pass
 
-    # Seeking Alpha 레이팅 (관련 티커 기반)
-    if tickers and RAPIDAPI_KEY:
-        ticker_list = [t.strip() for t in tickers.split(",") if t.strip()]
-        for symbol in ticker_list[:5]:
-            data = _sa_get("/symbols/get-ratings", {"symbol": symbol})
-            if data and "data" in data and isinstance(data["data"], list) and len(data["data"]) > 0:
-                try:
-                    r = data["data"][0].get("attributes", {}).get("ratings", {})
-                    result["seeking_alpha_ratings"].append({
-                        "symbol": symbol,
-                        "wall_street": round(r.get("sellSideRating", 0), 2) if r.get("sellSideRating") else "",
-                        "quant": round(r.get("quantRating", 0), 2) if r.get("quantRating") else "",
-                        "authors": round(r.get("authorsRating", 0), 2) if r.get("authorsRating") else "",
-                    })
-                except Exception:
-                    continue
 
+async def _start_webhook_tasks():
+    global webhook_outbox
+    if webhook_outbox is None:
+        webhook_outbox = WebhookOutbox(WEBHOOK_DB)
+    _webhook_tasks.append(asyncio.create_task(_webhook_worker()))
+    _webhook_tasks.append(asyncio.create_task(_webhook_refresher()))
+
+
+async def _stop_webhook_tasks():
+    for task in _webhook_tasks:
+        task.cancel()
+    _webhook_tasks.clear()
+
+
+_BACKGROUND_SERVICES.append((_start_webhook_tasks, _stop_webhook_tasks))
+
+
+class WebhookSubscription(BaseModel):
+    url: str
+    feeds: list[str] = []       # 비우면 전체 (daily-feed, daily-briefing, kr-market, us-market)
+    markets: list[str] = []     # 비우면 전체 (kr, us) — 공통 피드는 항상 포함
+    secret: str | None = None   # 지정 시 X-Webhook-Signature: sha256=HMAC(secret, body)
+
+
+def _check_webhook_token(token: str | None):
+    if webhook_outbox is None:
+        raise HTTPException(status_code=503, detail="웹훅 저장소가 아직 열리지 않았습니다")
+    if not WEBHOOK_REGISTRATION_TOKEN:
+        raise HTTPException(status_code=403, detail="웹훅 API 비활성화 (WEBHOOK_REGISTRATION_TOKEN 미설정)")
+    if not token or not hmac.compare_digest(token.encode(), WEBHOOK_REGISTRATION_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="X-Webhook-Token이 올바르지 않습니다")
+
+
+@app.post("/api/webhooks")
+async def create_webhook(sub: WebhookSubscription, x_webhook_token: str | None = Header(default=None)):
+    """웹훅 구독 등록 (X-Webhook-Token 필요)"""
+    _check_webhook_token(x_webhook_token)
+    error = await _webhook_target_error(sub.url)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    unknown = set(sub.feeds) - set(WEBHOOK_FEEDS) or set(sub.markets) - WEBHOOK_MARKETS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 feeds/markets: {sorted(unknown)}")
+    result = webhook_outbox.add_subscriber(sub.url, sub.feeds, sub.markets, sub.secret)
+    # 등록 직후 현재 스냅샷이 있으면 바로 1회 전송, 없는 피드는 재수집 루프가 생성
+    for key, _, _ in WEBHOOK_FEEDS.values():
+        snap = snapshot_store.peek(key)
+        if snap is not None:
+            _publish_snapshot(snap, result["id"])
+    _webhook_refresh_now.set()
     return result
 
 
+@app.get("/api/webhooks")
+async def list_webhooks(x_webhook_token: str | None = Header(default=None)):
+    """웹훅 구독 목록 (대기/실패 건수 포함, X-Webhook-Token 필요)"""
+    _check_webhook_token(x_webhook_token)
+    return {"subscribers": webhook_outbox.subscribers()}
+
+
+@app.delete("/api/webhooks/{sub_id}")
+async def delete_webhook(sub_id: str, x_webhook_token: str | None = Header(default=None)):
+    _check_webhook_token(x_webhook_token)
+    if not webhook_outbox.remove_subscriber(sub_id):
+        raise HTTPException(status_code=404, detail="구독 없음")
+    return {"deleted": sub_id}
+
+
 # ============================================================
-# 8. 통합 JSON 데이터 (기존 호환)
+# 11. 비동기 작업 API (요청 수명과 분리된 피드/브리핑/차트/리서치 작업 + 우선순위 큐)
 # ============================================================
-@app.get("/api/daily-briefing")
-async def get_daily_briefing():
-    """한국+미국 증시 + 환율 통합 JSON 데이터"""
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = 64            # 대기 작업 수 상한 (초과 시 503)
+JOB_MAX_ITEMS = 256           # 보관 작업 수 상한 (완료된 오래된 작업부터 제거)
+JOB_TTL = int(os.environ.get("JOB_TTL", "3600"))  # 완료 후 결과 보관 시간 (초)
+JOB_MAX_CHARTS = 20
+JOB_RETRY_AFTER = 30          # 큐가 가득 찼을 때 Retry-After (초)
+# 작업 종류 → 기본 우선순위 (작을수록 먼저)
+JOB_PRIORITIES = {"briefing": 0, "feed": 1, "research": 2, "chart-batch": 3}
+
+_current_job: contextvars.ContextVar["Job | None"] = contextvars.ContextVar("current_job", default=None)
+
+
+async def track_source(source: str, awaitable):
+    """실행 중인 작업이 있으면 소스별 진행 상태(running/done/failed) 기록"""
+    job = _current_job.get()
+    if job is None:
+        return await awaitable
+    job.progress[source] = "running"
+    try:
+        result = await awaitable
+    except Exception:
+        job.progress[source] = "failed"
+        raise
+    job.progress[source] = "done"
+    return result
+
+
+class JobRequest(BaseModel):
+    type: str                           # feed | briefing | chart-batch | research
+    priority: int | None = None         # 기본값은 JOB_PRIORITIES
+    max_tokens: int | None = None       # feed
+    watchlist: str = DEFAULT_WATCHLIST  # feed, briefing
+    charts: list[ChartRequest] = []     # chart-batch
+    topics: list[TopicQuery] = []       # research
+
+
+class Job:
+    """작업 1건의 상태/진행률/결과"""
+    __slots__ = ("id", "type", "req", "priority", "dedupe_key", "status", "progress",
+                 "result", "error", "created_at", "started_at", "finished_at", "finished_mono")
+
+    def __init__(self, req: JobRequest, dedupe_key: str | None):
+        self.id = os.urandom(8).hex()
+        self.type = req.type
+        self.req = req
+        self.priority = JOB_PRIORITIES[req.type] if req.priority is None else req.priority
+        self.dedupe_key = dedupe_key
+        self.status = "queued"
+        self.progress: dict[str, str] = {}
+        self.result = None
+        self.error: str | None = None
+        self.created_at = datetime.now()
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.finished_mono: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "progress": dict(self.progress),
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.status == "done":
+            data["result"] = self.result
+        return data
+
+
+class JobStore:
+    """작업 보관소 (완료 후 JOB_TTL 경과 시 제거, 상한 초과 시 오래된 완료 작업부터 제거)"""
+
+    def __init__(self, max_items: int = JOB_MAX_ITEMS, ttl: float = JOB_TTL):
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._active: dict[str, Job] = {}   # dedupe_key → 대기/실행 중 작업
+        self._max_items = max_items
+        self._ttl = ttl
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=JOB_QUEUE_MAX)
+        self._seq = 0
+
+    def _evict(self):
+        now = time.monotonic()
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished_mono > self._ttl]:
+            del self._jobs[job_id]
+        finished = (j.id for j in list(self._jobs.values()) if j.finished)
+        while len(self._jobs) >= self._max_items:
+            job_id = next(finished, None)
+            if job_id is None:
+                break
+            del self._jobs[job_id]
+
+    def submit(self, req: JobRequest, dedupe_key: str | None = None) -> Job:
+        """작업 등록 (같은 dedupe_key 작업이 대기/실행 중이면 그 작업 반환)"""
+        if dedupe_key is not None and dedupe_key in self._active:
+            return self._active[dedupe_key]
+        self._evict()
+        if len(self._jobs) >= self._max_items:
+            raise asyncio.QueueFull
+        job = Job(req, dedupe_key)
+        self._seq += 1
+        self.queue.put_nowait((job.priority, self._seq, job.id))
+        self._jobs[job.id] = job
+        if dedupe_key is not None:
+            self._active[dedupe_key] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        self._evict()
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        self._evict()
+        return list(self._jobs.values())
+
+    def finish(self, job: Job, result=None, error: str | None = None):
+        job.status = "failed" if error else "done"
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.now()
+        job.finished_mono = time.monotonic()
+        if job.dedupe_key is not None and self._active.get(job.dedupe_key) is job:
+            del self._active[job.dedupe_key]
+
+
+job_store = JobStore()
+_job_tasks: list[asyncio.Task] = []
+
+
+async def _run_feed_job(job: Job):
+    wl = resolve_watchlist(job.req.watchlist)
+    key = wl.cache_key(f"daily-feed:{job.req.max_tokens or 'full'}")
+    return (await snapshot_store.get(key, lambda: get_daily_feed(job.req.max_tokens, wl))).data
+
+
+async def _run_briefing_job(job: Job):
+    wl = resolve_watchlist(job.req.watchlist)
+    return (await snapshot_store.get(wl.cache_key("daily-briefing"), lambda: get_daily_briefing(wl))).data
+
+
+async def _run_chart_batch_job(job: Job):
+    loop = asyncio.get_running_loop()
+    results = []
+    for i, chart in enumerate(job.req.charts):
+        source = f"chart:{i}:{chart.market}:{chart.symbol}"
+        try:
+            png = await track_source(source, loop.run_in_executor(_upstream_executor, render_chart_png, chart))
+            results.append({"symbol": chart.symbol, "market": chart.market,
+                            "png_base64": base64.b64encode(png).decode("ascii")})
+        except HTTPException as e:
+            results.append({"symbol": chart.symbol, "market": chart.market, "error": e.detail})
+        except Exception as e:
+            results.append({"symbol": chart.symbol, "market": chart.market, "error": str(e)})
+    return results
+
+
+async def _run_research_job(job: Job):
+    results = await research_topics(job.req.topics)
+    return [
+        {"topic": q.topic, "topic_en": q.topic_en, "tickers": q.ticker_list(), **r}
+        for q, r in zip(job.req.topics, results)
+    ]
+
+
+JOB_RUNNERS = {
+    "feed": _run_feed_job,
+    "briefing": _run_briefing_job,
+    "chart-batch": _run_chart_batch_job,
+    "research": _run_research_job,
+}
+
+
+async def _job_worker():
+    while True:
+        _, _, job_id = await job_store.queue.get()
+        job = job_store.get(job_id)
+        if job is None:
+            continue
+        job.status = "running"
+        job.started_at = datetime.now()
+        token = _current_job.set(job)
+        try:
+            job_store.finish(job, await JOB_RUNNERS[job.type](job))
+        except HTTPException as e:
+            job_store.finish(job, error=str(e.detail))
+        except Exception as e:
+            job_store.finish(job, error=str(e) or type(e).__name__)
+        finally:
+            _current_job.reset(token)
+
+
+async def _start_job_workers():
+    _job_tasks.extend(asyncio.create_task(_job_worker()) for _ in range(JOB_WORKERS))
+
+
+async def _stop_job_workers():
+    for task in _job_tasks:
+        task.cancel()
+    _job_tasks.clear()
+
+
+_BACKGROUND_SERVICES.append((_start_job_workers, _stop_job_workers))
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(req: JobRequest):
+    """작업 등록 → job id 반환 (GET /api/jobs/{id}로 상태/진행률/결과 조회)"""
+    if req.type not in JOB_RUNNERS:
+        raise HTTPException(status_code=400, detail=f"type은 {sorted(JOB_RUNNERS)} 중 하나여야 합니다")
+    dedupe_key = None
+    if req.type == "feed":
+        resolve_watchlist(req.watchlist)
+        if req.max_tokens is not None and req.max_tokens < FEED_BUDGET_RESERVE * 2:
+            raise HTTPException(status_code=400, detail=f"max_tokens는 {FEED_BUDGET_RESERVE * 2} 이상이어야 합니다")
+        dedupe_key = f"feed:{req.max_tokens or 'full'}@{req.watchlist}"
+    elif req.type == "briefing":
+        resolve_watchlist(req.watchlist)
+        dedupe_key = f"briefing@{req.watchlist}"
+    elif req.type == "chart-batch" and not 0 < len(req.charts) <= JOB_MAX_CHARTS:
+        raise HTTPException(status_code=400, detail=f"charts는 1~{JOB_MAX_CHARTS}개여야 합니다")
+    elif req.type == "research" and not req.topics:
+        raise HTTPException(status_code=400, detail="topics가 비어 있습니다")
+
     try:
-        kr = await get_kr_market_data()
-        us = await get_us_market_data()
-        forex = await get_forex_data()
+        job = job_store.submit(req, dedupe_key)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="작업 큐가 가득 찼습니다",
+                            headers={"Retry-After": str(JOB_RETRY_AFTER)})
+    return {"id": job.id, "status": job.status, "priority": job.priority}
+
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """작업 목록 (결과 제외)"""
+    return {"jobs": [job.to_dict(include_result=False) for job in job_store.jobs()]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업 없음 (만료되었거나 존재하지 않음)")
+    return Response(content=_dump_json(job.to_dict()), media_type="application/json")
+
+
+# ============================================================
+# 12. 요청 수락 제어 (엔드포인트 등급별 동시성 + 우선순위 대기열 + 클라이언트별 제한)
+# ============================================================
+ADMISSION_GLOBAL_LIMIT = int(os.environ.get("ADMISSION_GLOBAL_LIMIT", "24"))  # 전체 동시 실행 상한
+ADMISSION_QUEUE_MAX = int(os.environ.get("ADMISSION_QUEUE_MAX", "64"))        # 대기열 상한 (초과 시 503)
+ADMISSION_CLIENT_LIMIT = int(os.environ.get("ADMISSION_CLIENT_LIMIT", "8"))   # 클라이언트별 실행+대기 상한 (초과 시 429)
+ADMISSION_WAIT_TIMEOUT = 30    # 초, 대기 중 이 시간을 넘기면 503
+ADMISSION_RETRY_AFTER = 5      # 초
+ADMISSION_EXEMPT = {"/health"}  # 제한 없이 항상 즉시 처리
+# 앞단 신뢰 프록시 수 — X-Forwarded-For에서 오른쪽부터 이만큼 떨어진 항목이 프록시가 본 실제 클라이언트
+ADMISSION_PROXY_HOPS = int(os.environ.get("ADMISSION_PROXY_HOPS", "1"))
+# 클라이언트 구분에 쓸 API 키 목록 (쉼표 구분). 목록에 없는 키는 무시하고 IP로 구분
+ADMISSION_API_KEYS = {k.strip() for k in os.environ.get("ADMISSION_API_KEYS", "").split(",") if k.strip()}
+# 등급 → (동시 실행 상한, 우선순위 — 작을수록 먼저)
+ADMISSION_CLASSES = {
+    "cached": (32, 0),   # 유효한 스냅샷이 있는 조회
+    "read": (12, 1),     # 가벼운 JSON 조회/등록
+    "build": (3, 2),     # 업스트림 수집이 필요한 조회
+    "render": (2, 3),    # 차트 렌더링
+}
+
 
+def _wl_key(q: dict, base: str) -> str:
+    """쿼리의 watchlist를 반영한 스냅샷 키 (Watchlist.cache_key와 동일 규칙)"""
+    name = q.get("watchlist") or DEFAULT_WATCHLIST
+    return base if name == DEFAULT_WATCHLIST else f"{base}@{name}"
+
+
+# (메서드, 경로, 등급, 스냅샷 키 함수(query, match) | None) — 키가 유효하면 cached로 승격
+ADMISSION_RULES = [
+    ("POST", re.compile(r"/api/chart$"), "render", None),
+    ("POST", re.compile(r"/api/topic-research/batch$"), "build", None),
+    ("GET", re.compile(r"/api/daily-feed$"), "build",
+     lambda q, m: _wl_key(q, f"daily-feed:{q.get('max_tokens') or 'full'}")),
+    ("GET", re.compile(r"/api/daily-feed/delta$"), "build", None),
+    ("GET", re.compile(r"/api/daily-briefing$"), "build", lambda q, m: _wl_key(q, "daily-briefing")),
+    ("GET", re.compile(r"/api/market-snapshot$"), "build",
+     lambda q, m: _wl_key(q, f"market-snapshot:{q.get('format', 'json')}:{q.get('max_tokens') or 'full'}")),
+    ("GET", re.compile(r"/api/topic-research$"), "build",
+     lambda q, m: f"topic-research:{q.get('topic', '')}|{q.get('topic_en', '')}|{q.get('tickers', '')}"),
+    ("GET", re.compile(r"/api/(kr|us)-market$"), "build",
+     lambda q, m: None if q.get("since") else _wl_key(q, f"{m.group(1)}-market:{q.get('days', '5')}")),
+    ("GET", re.compile(r"/api/(forex|news|tavily-news|seeking-alpha)$"), "build", lambda q, m: _wl_key(q, m.group(1))),
+]
+
+
+def _admission_class(scope) -> str:
+    for method, pattern, cls, key_fn in ADMISSION_RULES:
+        if scope["method"] != method:
+            continue
+        match = pattern.match(scope["path"])
+        if match is None:
+            continue
+        if key_fn is not None:
+            key = key_fn(dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))), match)
+            snap = snapshot_store.peek(key) if key else None
+            if snap is not None and snap.fresh:
+                return "cached"
+        return cls
+    return "read"
+
+
+def _client_key(scope) -> str:
+    """등록된 API 키(해시) 우선, 없으면 신뢰 프록시가 추가한 X-Forwarded-For 항목 또는 연결 IP"""
+    headers = dict(scope.get("headers") or [])
+    api_key = headers.get(b"x-api-key")
+    if api_key and api_key.decode("latin-1") in ADMISSION_API_KEYS:
+        return "key:" + hashlib.blake2b(api_key, digest_size=8).hexdigest()
+    # 왼쪽 항목은 클라이언트가 임의로 넣을 수 있으므로 프록시가 붙인 오른쪽 항목만 신뢰
+    forwarded = headers.get(b"x-forwarded-for")
+    if forwarded and ADMISSION_PROXY_HOPS > 0:
+        hops = [h.strip() for h in forwarded.decode("latin-1").split(",")]
+        if len(hops) >= ADMISSION_PROXY_HOPS and hops[-ADMISSION_PROXY_HOPS]:
+            return "ip:" + hops[-ADMISSION_PROXY_HOPS]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class _ReceivePump:
+    """대기 중 연결 종료 감지 — 시작 후엔 receive 메시지를 대신 읽어 앱에 그대로 전달"""
+
+    def __init__(self, receive):
+        self._receive = receive
+        self._messages: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self.disconnected = asyncio.Event()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self):
+        while True:
+            message = await self._receive()
+            self._messages.put_nowait(message)
+            if message["type"] == "http.disconnect":
+                self.disconnected.set()
+                return
+
+    async def receive(self):
+        if self._task is None:
+            return await self._receive()
+        if self._messages.empty() and self.disconnected.is_set():
+            return {"type": "http.disconnect"}
+        return await self._messages.get()
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+class AdmissionController:
+    """등급별/전체 동시 실행 수 관리 + 우선순위 대기열"""
+
+    def __init__(self):
+        self.running = dict.fromkeys(ADMISSION_CLASSES, 0)
+        self.total_running = 0
+        self.clients: dict[str, int] = {}
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0,
+                      "rejected_client_limit": 0, "timed_out": 0, "disconnected": 0}
+        self._waiters: list[tuple] = []  # (우선순위, 순번, 등급, future)
+        self._seq = 0
+
+    def _can_run(self, cls: str) -> bool:
+        return self.running[cls] < ADMISSION_CLASSES[cls][0] and self.total_running < ADMISSION_GLOBAL_LIMIT
+
+    def _start(self, cls: str):
+        self.running[cls] += 1
+        self.total_running += 1
+        self.stats["admitted"] += 1
+
+    def _leave(self, client: str):
+        left = self.clients.get(client, 1) - 1
+        if left > 0:
+            self.clients[client] = left
+        else:
+            self.clients.pop(client, None)
+
+    def _dispatch(self):
+        """우선순위 순으로 실행 가능한 대기 요청 승인"""
+        remaining = []
+        for entry in sorted(self._waiters, key=lambda e: e[:2]):
+            cls, fut = entry[2], entry[3]
+            if fut.done():
+                continue
+            if self._can_run(cls):
+                self._start(cls)
+                fut.set_result(True)
+            else:
+                remaining.append(entry)
+        self._waiters = remaining
+
+    async def acquire(self, cls: str, client: str, pump: _ReceivePump | None = None) -> str | None:
+        """실행 슬롯 획득. 거절 시 사유(client_limit | queue_full | timeout | disconnected) 반환"""
+        if self.clients.get(client, 0) >= ADMISSION_CLIENT_LIMIT:
+            self.stats["rejected_client_limit"] += 1
+            return "client_limit"
+        if self._can_run(cls):
+            self.clients[client] = self.clients.get(client, 0) + 1
+            self._start(cls)
+            return None
+        if len(self._waiters) >= ADMISSION_QUEUE_MAX:
+            self.stats["rejected_queue_full"] += 1
+            return "queue_full"
+
+        self.clients[client] = self.clients.get(client, 0) + 1
+        fut = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        self._waiters.append((ADMISSION_CLASSES[cls][1], self._seq, cls, fut))
+        self.stats["queued"] += 1
+        # 대기하는 동안 클라이언트 연결 종료를 감시 (끊기면 자리를 비우고 실행하지 않음)
+        gone = None
+        if pump is not None:
+            pump.start()
+            gone = asyncio.ensure_future(pump.disconnected.wait())
+        try:
+            await asyncio.wait({fut} if gone is None else {fut, gone}, timeout=ADMISSION_WAIT_TIMEOUT,
+                               return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            # 대기 중 태스크 취소 — 이미 승인됐으면 슬롯 반환
+            if fut.done() and not fut.cancelled():
+                self.release(cls, client)
+            else:
+                fut.cancel()
+                self._leave(client)
+            raise
+        finally:
+            if gone is not None:
+                gone.cancel()
+        disconnected = pump is not None and pump.disconnected.is_set()
+        if fut.done() and not disconnected:
+            return None
+        if fut.done():
+            self.release(cls, client)
+        else:
+            fut.cancel()
+            self._leave(client)
+        if disconnected:
+            self.stats["disconnected"] += 1
+            return "disconnected"
+        self.stats["timed_out"] += 1
+        return "timeout"
+
+    def release(self, cls: str, client: str):
+        self.running[cls] -= 1
+        self.total_running -= 1
+        self._leave(client)
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        waiting = {cls: 0 for cls in ADMISSION_CLASSES}
+        for _, _, cls, fut in self._waiters:
+            if not fut.done():
+                waiting[cls] += 1
         return {
-            "timestamp": datetime.now().isoformat(),
-            "kr_market": kr,
-            "us_market": us,
-            "forex": forex,
+            "classes": {
+                cls: {"limit": limit, "priority": priority, "running": self.running[cls], "waiting": waiting[cls]}
+                for cls, (limit, priority) in ADMISSION_CLASSES.items()
+            },
+            "running": self.total_running,
+            "global_limit": ADMISSION_GLOBAL_LIMIT,
+            "queue_max": ADMISSION_QUEUE_MAX,
+            "clients": len(self.clients),
+            "stats": dict(self.stats),
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+
+admission = AdmissionController()
+
+
+class AdmissionControlMiddleware:
+    """순수 ASGI 미들웨어 — 라우팅 전에 수락/대기/거절 결정"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ADMISSION_EXEMPT:
+            await self.app(scope, receive, send)
+            return
+        cls = _admission_class(scope)
+        client = _client_key(scope)
+        pump = _ReceivePump(receive)
+        try:
+            await self._admit(cls, client, pump, scope, send)
+        finally:
+            pump.close()
+
+    async def _admit(self, cls: str, client: str, pump: _ReceivePump, scope, send):
+        reason = await admission.acquire(cls, client, pump)
+        if reason == "disconnected":
+            return
+        if reason is not None:
+            status = 429 if reason == "client_limit" else 503
+            body = _dump_json({"detail": f"서버 과부하로 요청을 처리할 수 없습니다 ({reason})"})
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        try:
+            await self.app(scope, pump.receive, send)
+        finally:
+            admission.release(cls, client)
+
+
+app.add_middleware(AdmissionControlMiddleware)
+
+
+@app.get("/api/admission")
+async def get_admission():
+    """수락 제어 현황 (등급별 실행/대기 수, 거절 통계)"""
+    return admission.snapshot()
 
 
 # ============================================================
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+import main
+
+
+def stock(i):
+    return {"symbol": f"S{i}", "ticker": f"{i:06d}", "name": f"종목{i}",
+            "close": 1234.5 + i, "change_pct": 1.23, "volume": 123456}
+
+
+@pytest.fixture
+def snap():
+    trend = {"return_5d": 1.2, "return_20d": -3.1, "streak": 3}
+    return main.MarketSnapshot(
+        datetime(2026, 10, 19, 9, 0),
+        kr={
+            "kospi": dict(stock(1), trend=trend), "kosdaq": stock(2),
+            "major_stocks": {f"대형주{i}": dict(stock(i), trend=trend) for i in range(10)},
+            "investor_flow": {"개인": 10 ** 9, "외국인": -2 * 10 ** 9, "기관": 5 * 10 ** 8},
+            "top_gainers": [stock(i) for i in range(10)],
+            "top_losers": [stock(i) for i in range(10)],
+            "top_volume": [stock(i) for i in range(10)],
+        },
+        us={
+            "indices": {n: dict(stock(0), trend=trend) for n in ("S&P500", "NASDAQ", "DOW")},
+            "major_stocks": {f"Company{i}": dict(stock(i), trend=trend) for i in range(9)},
+        },
+        forex={f"FX{i}": {"price": 1400.12, "change_pct": 0.1} for i in range(6)},
+        enriched=True,
+        news={"headlines": [
+            {"keyword": f"키워드{i // 3}", "headline": f"헤드라인 뉴스 제목 예시 {i} 관련 기사", "source": "연합뉴스"}
+            for i in range(45)
+        ]},
+        tavily=[{"keyword": f"k{i // 3}", "title": f"Deep news title {i}", "content": "본문 " * 80} for i in range(15)],
+        ratings=[{"symbol": f"S{i}", "wall_street": 4.1, "quant": 3.2, "authors": 3.9} for i in range(12)],
+        trending=[{"title": f"Trending article number {i} about markets"} for i in range(10)],
+    )
+
+
+def feed_tokens(text):
+    return main._lines_tokens(text.split("\n"))
+
+
+@pytest.mark.parametrize("max_tokens", [160, 200, 300, 500, 800, 1200, 2000, 4000])
+def test_feed_stays_within_budget(snap, max_tokens):
+    assert feed_tokens(main.render_daily_feed(snap, max_tokens)) <= max_tokens
+
+
+def test_small_budget_keeps_high_priority_sections_compact(snap):
+    feed = main.render_daily_feed(snap, 300)
+
+    # 우선순위 1(미국/한국 지수, 환율)은 추세 없이 축약형으로라도 남음
+    for line in ("- S&P500:", "- KOSPI:", "- KOSDAQ:", "## 3. 환율 및 주요 지표", "- FX0:"):
+        assert line in feed
+    assert "5일" not in feed
+    # 더 낮은 우선순위 섹션은 제외
+    for header in ("### 미국 주요 종목", "## 4. 핵심 뉴스", "## 6. 애널리스트", "## 7. 마켓 뉴스"):
+        assert header not in feed
+
+
+@pytest.mark.parametrize("max_tokens", [160, 300, 800, 2000, 4000])
+def test_lower_priority_never_outlives_truncated_section(snap, monkeypatch, max_tokens):
+    fitted = []
+    fit = main._fit_feed_sections
+
+    def capture(sections, *args):
+        fitted[:] = sections
+        return fit(sections, *args)
+
+    monkeypatch.setattr(main, "_fit_feed_sections", capture)
+    main.render_daily_feed(snap, max_tokens)
+
+    truncated = {s.priority for s in fitted if s.items and len(s.kept) < len(s.items)}
+    if truncated:
+        assert all(not s.kept for s in fitted if s.priority > min(truncated))
+    # 잘린 단계는 전체형으로 확장하지 않음
+    for s in fitted:
+        if s.priority in truncated:
+            assert all(kept == (compact or full) for kept, (full, compact) in zip(s.kept, s.items))
+
+
+def test_full_feed_without_budget(snap):
+    feed = main.render_daily_feed(snap)
+    assert "## 7. 마켓 뉴스" in feed
+    assert "✂️" not in feed
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import main
+
+
+class StandIn:
+    """로컬 웹훅 수신 서버 (응답 코드 지정 + 수신 내역 기록)"""
+
+    def __init__(self):
+        self.status = 200
+        self.received = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stand_in.received.append((dict(self.headers), body))
+                self.send_response(stand_in.status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    box = main.WebhookOutbox(str(tmp_path / "webhooks.db"))
+    monkeypatch.setattr(main, "webhook_outbox", box)
+    # 로컬 수신 서버(루프백)만 허용
+    monkeypatch.setattr(main, "WEBHOOK_ALLOWED_HOSTS", {"127.0.0.1"})
+    return box
+
+
+def deliver_due(outbox):
+    rows = outbox.due(main.WEBHOOK_BATCH)
+
+    async def run():
+        await asyncio.gather(*(main._deliver_webhook(row) for row in rows))
+
+    asyncio.run(run())
+    return rows
+
+
+def outbox_rows(outbox):
+    return outbox._query("SELECT feed, version, status, attempts, next_attempt FROM outbox")
+
+
+def register(url, token="t0ken"):
+    return asyncio.run(main.create_webhook(main.WebhookSubscription(url=url), x_webhook_token=token))
+
+
+def test_registration_requires_configured_token(outbox, monkeypatch):
+    monkeypatch.setattr(main, "WEBHOOK_REGISTRATION_TOKEN", "")
+    with pytest.raises(main.HTTPException) as e:
+        register("https://93.184.216.34/hook")
+    assert e.value.status_code == 403
+
+    monkeypatch.setattr(main, "WEBHOOK_REGISTRATION_TOKEN", "t0ken")
+    for token in (None, "wrong"):
+        with pytest.raises(main.HTTPException) as e:
+            register("https://93.184.216.34/hook", token)
+        assert e.value.status_code == 401
+    assert register("https://93.184.216.34/hook")["url"] == "https://93.184.216.34/hook"
+
+
+@pytest.mark.parametrize("url", [
+    "http://localhost:8080/hook",
+    "http://127.0.0.2/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.10/hook",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "http://0.0.0.0/hook",
+    "ftp://93.184.216.34/hook",
+])
+def test_registration_rejects_internal_targets(outbox, monkeypatch, url):
+    monkeypatch.setattr(main, "WEBHOOK_REGISTRATION_TOKEN", "t0ken")
+    with pytest.raises(main.HTTPException) as e:
+        register(url)
+    assert e.value.status_code == 400
+    assert outbox.subscribers() == []
+
+
+def test_allow_listed_internal_host_is_accepted(outbox, monkeypatch, stand_in):
+    monkeypatch.setattr(main, "WEBHOOK_REGISTRATION_TOKEN", "t0ken")
+    assert register(stand_in.url)["url"] == stand_in.url
+
+
+def test_delivery_rechecks_target(outbox, stand_in, monkeypatch):
+    outbox.add_subscriber(stand_in.url, ["daily-feed"], [], None)
+    outbox.enqueue("daily-feed", "v1", b"{}")
+    monkeypatch.setattr(main, "WEBHOOK_ALLOWED_HOSTS", set())
+    deliver_due(outbox)
+
+    assert stand_in.received == []
+    _, _, status, attempts, _ = outbox_rows(outbox)[0]
+    assert (status, attempts) == ("pending", 1)
+
+
+def test_pending_deliveries_coalesce_to_latest_version(outbox, stand_in):
+    outbox.add_subscriber(stand_in.url, ["daily-briefing"], [], None)
+    outbox.enqueue("daily-briefing", "v1", b'{"n": 1}')
+    outbox.enqueue("daily-briefing", "v2", b'{"n": 2}')
+
+    assert [(feed, version) for feed, version, *_ in outbox_rows(outbox)] == [("daily-briefing", "v2")]
+    deliver_due(outbox)
+    assert [body for _, body in stand_in.received] == [b'{"n": 2}']
+    assert outbox_rows(outbox) == []
+
+
+def test_enqueue_respects_feed_and_market_filters(outbox, stand_in):
+    outbox.add_subscriber(stand_in.url, ["kr-market"], [], None)
+    outbox.add_subscriber(stand_in.url, [], ["us"], None)
+
+    assert outbox.enqueue("kr-market", "v1", b"{}") == 1
+    assert outbox.enqueue("us-market", "v1", b"{}") == 1
+    assert outbox.enqueue("daily-feed", "v1", b"{}") == 1
+
+
+def test_signed_delivery(outbox, stand_in):
+    outbox.add_subscriber(stand_in.url, [], [], "s3cret")
+    outbox.enqueue("daily-feed", "v1", b'{"ok": true}')
+    deliver_due(outbox)
+
+    headers, body = stand_in.received[0]
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert headers["X-Webhook-Signature"] == f"sha256={expected}"
+    assert headers["X-Webhook-Event"] == "daily-feed"
+
+
+def test_failed_delivery_backs_off_exponentially(outbox, stand_in):
+    stand_in.status = 500
+    outbox.add_subscriber(stand_in.url, ["daily-feed"], [], None)
+    outbox.enqueue("daily-feed", "v1", b"{}")
+
+    delays = []
+    for attempt in range(1, 4):
+        # 재시도 시각을 당겨 바로 재전송
+        outbox._query("UPDATE outbox SET next_attempt = 0")
+        before = time.time()
+        deliver_due(outbox)
+        _, _, status, attempts, next_attempt = outbox_rows(outbox)[0]
+        assert (status, attempts) == ("pending", attempt)
+        delays.append(next_attempt - before)
+
+    for attempt, delay in enumerate(delays):
+        base = main.WEBHOOK_BACKOFF_BASE * 2 ** attempt
+        assert base * 0.8 - 1 <= delay <= base * 1.2 + 1
+    assert outbox.due(main.WEBHOOK_BATCH) == []
+
+
+def test_delivery_is_dead_lettered_after_max_attempts(outbox, stand_in):
+    stand_in.status = 503
+    outbox.add_subscriber(stand_in.url, ["daily-feed"], [], None)
+    outbox.enqueue("daily-feed", "v1", b"{}")
+
+    for _ in range(main.WEBHOOK_MAX_ATTEMPTS):
+        outbox._query("UPDATE outbox SET next_attempt = 0")
+        deliver_due(outbox)
+
+    _, _, status, attempts, _ = outbox_rows(outbox)[0]
+    assert (status, attempts) == ("dead", main.WEBHOOK_MAX_ATTEMPTS)
+    assert len(stand_in.received) == main.WEBHOOK_MAX_ATTEMPTS
+    assert outbox.due(main.WEBHOOK_BATCH) == []
+    assert outbox.subscribers()[0]["dead"] == 1
+
+    # dead 건이 있어도 새 버전은 새로 적재
+    outbox.enqueue("daily-feed", "v2", b"{}")
+    assert outbox.subscribers()[0]["pending"] == 1
+
+
+def test_unchanged_snapshot_is_published_once(outbox, stand_in):
+    outbox.add_subscriber(stand_in.url, ["daily-briefing"], [], None)
+    snap = main.Snapshot("daily-briefing", "v1", {"a": 1}, ttl=60)
+
+    main._publish_snapshot(snap)
+    deliver_due(outbox)
+    main._publish_snapshot(snap)
+    assert outbox_rows(outbox) == []
+    assert json.loads(stand_in.received[0][1])["version"] == "v1"
+
+    main._publish_snapshot(main.Snapshot("daily-briefing", "v2", {"a": 2}, ttl=60))
+    assert [version for _, version, *_ in outbox_rows(outbox)] == ["v2"]
+
+
+def test_refresh_is_scheduled_from_trading_calendar(monkeypatch):
+    closed = {"KRX": 3600.0, "NYSE": 7200.0}
+    for cal in (main.KRX, main.NYSE):
+        monkeypatch.setattr(cal, "seconds_until_change", lambda now=None, name=cal.name: closed[name])
+
+    assert main._webhook_refresh_due("kr-market", None)
+    stale = time.monotonic() - main.WEBHOOK_ENRICHED_REFRESH_SECONDS - 1
+    assert not main._webhook_refresh_due("daily-feed", stale)
+    assert main._webhook_refresh_wait({"kr-market", "us-market"}) == 3600.0
+    assert main._webhook_refresh_wait({"us-market"}) == 7200.0
+
+    closed["KRX"] = 0.0
+    assert main._webhook_refresh_due("kr-market", stale)
+    assert not main._webhook_refresh_due("us-market", stale)
+    assert main._webhook_refresh_due("daily-briefing", stale)
+    assert not main._webhook_refresh_due("daily-feed", time.monotonic())
+    assert main._webhook_refresh_wait({"kr-market"}) == main.WEBHOOK_REFRESH_SECONDS